@@ -0,0 +1,86 @@
+"""
+The python-docx render path schedules were made with before RenderPlan: a deep copy of the parsed
+template per meeting, filled in through the python-docx object model and saved with Document.save.
+Kept only as the benchmarks' baseline for the render, doc_save and pdf_export stages.
+"""
+import copy
+
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.ns import qn
+from docx.shared import Pt
+
+from meeting_schedules.rendering import TemplatePlaceholders, build_agenda_table
+
+
+def render_meeting(template_doc, meeting, config, placeholders=None):
+    """
+    Fill in a copy of the meeting schedule template for one meeting block.
+    The template document itself is never modified, so it can be reused for every meeting.
+    meeting["dropdown_choice"] must already be set (see UniformRules.resolve).
+    placeholders is the template's TemplatePlaceholders (scanned with the drill phrase); it's
+    scanned here if not given.
+    """
+    drill_phrase = config["drill_test_sign_up_phrase"].strip()
+    if placeholders is None:
+        placeholders = TemplatePlaceholders(template_doc, [drill_phrase])
+    # Document caches its body wrapper once the paragraphs are read (as the placeholder scan does), and
+    # deepcopy gives the copy its own detached copy of that wrapper. Wrap the copied XML in a fresh
+    # Document so edits land in the part that gets saved.
+    doc = copy.deepcopy(template_doc).part.document
+    meeting_date = meeting["date"]
+    details = meeting["details"]
+
+    # Fill in [DATE] (e.g. "May 19, 2025") and, if the uniform is known, [UNIFORM]
+    values = {"DATE": meeting_date.strftime("%B %d, %Y")}
+    if meeting["dropdown_choice"]:
+        values["UNIFORM"] = meeting["dropdown_choice"]
+    placeholders.substitute(doc, values)
+
+    # --- Remove existing tables before adding a new one ---
+    # This will remove all tables in the document
+    tables = doc.tables
+    for table_obj in tables:
+        tbl_element = table_obj._element
+        tbl_element.getparent().remove(tbl_element)
+
+    # Build the agenda table in one go and add it at the end of the document, before the section properties
+    section = doc.sections[-1]
+    block_width = (section.page_width - section.left_margin - section.right_margin) // 635  # EMU to twentieths of a point
+    table = build_agenda_table(details, doc.styles['Table Grid'].style_id, block_width)
+    body = doc.element.body
+    sectPr = body.find(qn('w:sectPr'))
+    if sectPr is not None:
+        sectPr.addprevious(table)
+    else:
+        body.append(table)
+
+    # --- Uniform logic for drill test sign-up phrase ---
+    # The uniform is the value in the cell directly below the meeting date, in the "Meeting" column
+    uniform_value = meeting["uniform"]
+
+    if config["add_drill_test_signup_text_to_abu_uniform_meetings"]:
+
+        para_idx = placeholders.phrases.get(drill_phrase)
+
+        if "abus" in uniform_value.lower():
+            print(f"Adding drill test sign-up phrase. (Edit or disable this in the config file if needed.)")
+            # If not present, add it (size 16, bold) before the table
+            if para_idx is None:
+                # Insert before the table by adding to the end, then moving it up
+                para = doc.add_paragraph()
+                run = para.add_run(drill_phrase)
+                run.font.size = Pt(16)
+                run.bold = True
+                para.alignment = WD_ALIGN_PARAGRAPH.CENTER  # Center the paragraph
+                # Move the new paragraph to just before the table
+                doc._body._element.remove(para._element)
+                table_idx = len(doc.paragraphs)  # Table will be added next
+                doc._body._element.insert(table_idx, para._element)
+            # If present, do nothing (keep it)
+        else:
+            # If present, remove it
+            if para_idx is not None:
+                p = doc.paragraphs[para_idx]
+                p.clear()
+
+    return doc
@@ -0,0 +1,305 @@
+"""
+Times each stage of making schedules on synthetic quarters and writes the results as JSON.
+
+    python benchmarks/run_benchmarks.py --meetings 13 52 260 --sheets 1 8 --output results.json
+    python benchmarks/run_benchmarks.py --baseline results.json
+
+Every stage is timed --repeat times (the JSON has the fastest and the median run), then run once
+more under tracemalloc for its peak memory. With --baseline, stages that got slower than the
+earlier results are listed.
+"""
+import argparse
+import contextlib
+import copy
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document  # noqa: E402
+
+from docx_baseline import render_meeting  # noqa: E402
+from stand_in import serve_folder, serve_sharepoint  # noqa: E402
+from synthetic import DATE_FORMATS, make_template, make_workbook  # noqa: E402
+
+from meeting_schedules import native_pdf  # noqa: E402
+from meeting_schedules.downloads import download_with_retries, make_download_session  # noqa: E402
+from meeting_schedules.pdf import pdf_backend, try_export_pdf  # noqa: E402
+from meeting_schedules.rendering import RenderPlan, TemplatePlaceholders, build_agenda_table  # noqa: E402
+from meeting_schedules.spreadsheet import build_meeting_index, load_meeting_index, stream_current_sheet  # noqa: E402
+from meeting_schedules.uploads import upload_schedules  # noqa: E402
+from meeting_schedules.uniforms import UniformRules  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DRILL_PHRASE = "Drill test sign-up will be offered prior to the start of the meeting."
+BENCH_CONFIG = {
+    "add_drill_test_signup_text_to_abu_uniform_meetings": True,
+    "drill_test_sign_up_phrase": DRILL_PHRASE,
+    "export_as_pdf": True,
+    "pdf_export_timeout": 120,
+}
+# A stage counts as a regression when its median is this much slower than the baseline
+REGRESSION_RATIO = 1.2
+
+
+def measure(stage, repeat, setup=None):
+    """
+    Time stage() repeat times, then run it once more under tracemalloc for its peak memory.
+    With setup, stage(setup()) is timed instead, and setup isn't part of the time.
+    print() output from the code being measured is thrown away.
+    """
+    def run():
+        if setup is None:
+            start = time.perf_counter()
+            stage()
+        else:
+            arg = setup()
+            start = time.perf_counter()
+            stage(arg)
+        return time.perf_counter() - start
+
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            times.append(run())
+        tracemalloc.start()
+        try:
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {
+        "seconds_min": min(times),
+        "seconds_median": statistics.median(times),
+        "runs": repeat,
+        "peak_alloc_bytes": peak,
+    }
+
+
+def run_scenario(scenario, folder, repeat, pdf_count):
+    workbook_path = os.path.join(folder, "workbook.xlsx")
+    template_path = os.path.join(folder, "template.docx")
+    dates = make_workbook(workbook_path, scenario["meetings"], scenario["rows_per_meeting"], scenario["sheets"],
+                          scenario["date_format"], title_rows=2)
+    make_template(template_path, paragraphs=scenario["template_paragraphs"])
+    target = {dates[len(dates) // 2].date()}
+
+    stages = {}
+    # The workbook downloaded from a local stand-in, whole and with the connection dropping halfway
+    session = make_download_session()
+    with serve_folder(folder, drop_after=os.path.getsize(workbook_path) // 2) as (base_url, server):
+        def download(resume):
+            server.drops = 1 if resume else 0
+            download_with_retries(f"{base_url}/workbook.xlsx", io.BytesIO(), "Downloading", session, quiet=True)
+        stages["download"] = measure(lambda: download(False), repeat)
+        stages["download_resumed"] = measure(lambda: download(True), repeat)
+    session.close()
+    stages["spreadsheet_load"] = measure(lambda: stream_current_sheet(workbook_path), repeat)
+    df, _ = stream_current_sheet(workbook_path)
+    stages["meeting_index"] = measure(lambda: build_meeting_index(df), repeat)
+    stages["single_date_lookup"] = measure(lambda: load_meeting_index(workbook_path, None, target), repeat)
+    # The same lookup answered by the schedule store, once the quarter is in it
+    cache_folder = os.path.join(folder, "cache")
+    load_meeting_index(workbook_path, cache_folder)
+    stages["store_lookup"] = measure(lambda: load_meeting_index(workbook_path, cache_folder, target), repeat)
+
+    meetings = list(build_meeting_index(df).values())
+    UniformRules(abu_sleeves="rolled").resolve(meetings)
+    template_doc = Document(template_path)
+    placeholders = TemplatePlaceholders(template_doc, [DRILL_PHRASE])
+    style_id = template_doc.styles["Table Grid"].style_id
+    section = template_doc.sections[-1]
+    block_width = (section.page_width - section.left_margin - section.right_margin) // 635
+
+    stages["table_build"] = measure(
+        lambda: [build_agenda_table(meeting["details"], style_id, block_width) for meeting in meetings], repeat)
+
+    def substitute_all(copies):
+        for doc, meeting in zip(copies, meetings):
+            placeholders.substitute(doc, {"DATE": meeting["date"].strftime("%B %d, %Y"), "UNIFORM": meeting["dropdown_choice"]})
+    # The template copies are made outside the timing so only the substitution itself is measured
+    stages["placeholder_substitution"] = measure(
+        substitute_all, repeat, setup=lambda: [copy.deepcopy(template_doc).part.document for _ in meetings])
+
+    stages["render"] = measure(
+        lambda: [render_meeting(template_doc, meeting, BENCH_CONFIG, placeholders) for meeting in meetings], repeat)
+
+    stages["template_compile"] = measure(lambda: RenderPlan(template_path, DRILL_PHRASE), repeat)
+    plan = RenderPlan(template_path, DRILL_PHRASE)
+    # Render plus save to bytes, compare with render and doc_save together
+    stages["plan_render"] = measure(lambda: [plan.render(meeting, BENCH_CONFIG) for meeting in meetings], repeat)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        docs = [render_meeting(template_doc, meeting, BENCH_CONFIG, placeholders) for meeting in meetings]
+    save_folder = os.path.join(folder, "out")
+    os.makedirs(save_folder, exist_ok=True)
+    docx_paths = [os.path.join(save_folder, f"{i} Meeting Schedule.docx") for i in range(len(docs))]
+    stages["doc_save"] = measure(lambda: [doc.save(path) for doc, path in zip(docs, docx_paths)], repeat)
+
+    stages.update(measure_uploads(folder, docx_paths, meetings, repeat))
+
+    if native_pdf.is_available():
+        with contextlib.redirect_stdout(io.StringIO()):
+            documents = [plan.render_document(meeting, BENCH_CONFIG) for meeting in meetings]
+        stages["native_pdf"] = measure(lambda: [native_pdf.render_pdf(document, plan.pdf_layout) for document in documents], repeat)
+        stages["native_pdf"]["items"] = len(meetings)
+    else:
+        stages["native_pdf"] = {"skipped": "reportlab is not installed"}
+
+    # Word or LibreOffice, the converters native_pdf replaces
+    backend = pdf_backend(native=False)
+    if pdf_count and backend:
+        converted = docx_paths[:pdf_count]
+        stages["pdf_export"] = measure(
+            lambda: [try_export_pdf(path, save_folder, os.path.basename(path)[:-5] + ".pdf", timeout=BENCH_CONFIG["pdf_export_timeout"], native=False)
+                     for path in converted], 1)
+        stages["pdf_export"]["backend"] = backend
+        stages["pdf_export"]["items"] = len(converted)
+    else:
+        stages["pdf_export"] = {"skipped": "no PDF converter found" if pdf_count else "--pdf not given"}
+
+    for name in ("meeting_index", "table_build", "placeholder_substitution", "render", "plan_render", "doc_save"):
+        stages[name]["items"] = len(meetings)
+    return {
+        "scenario": scenario,
+        "workbook_bytes": os.path.getsize(workbook_path),
+        "stages": stages,
+    }
+
+
+def measure_uploads(folder, docx_paths, meetings, repeat):
+    """
+    Time uploading the saved schedules to a local SharePoint stand-in: every file new ("upload",
+    large ones in chunks), and every file already there ("upload_unchanged").
+    """
+    try:
+        import office365  # noqa: F401
+    except ImportError:
+        skipped = {"skipped": "Office365-REST-Python-Client is not installed"}
+        return {"upload": skipped, "upload_unchanged": dict(skipped)}
+
+    results = [{"docx": path, "pdf": None, "error": None, "date": meeting["date"].strftime("%m-%d-%Y")}
+               for path, meeting in zip(docx_paths, meetings)]
+    stages = {}
+    token = os.environ.get("SHAREPOINT_ACCESS_TOKEN")
+    with serve_sharepoint() as (site_url, server):
+        os.environ["SHAREPOINT_ACCESS_TOKEN"] = server.access_token
+        config = {
+            "sharepoint_site_url": site_url,
+            "sharepoint_meetings_folder": f"{server.site_path}/Shared Documents/Meetings",
+            "base_meetings_folder": folder,
+            # Small enough that the schedules go through upload sessions too
+            "upload_chunk_mb": 0.01,
+        }
+        try:
+            # A new upload cache for every run, so every file is sent
+            stages["upload"] = measure(lambda cache_folder: upload_schedules(results, config, cache_folder), repeat,
+                                       setup=lambda: tempfile.mkdtemp(dir=folder))
+            cache_folder = tempfile.mkdtemp(dir=folder)
+            with contextlib.redirect_stdout(io.StringIO()):
+                upload_schedules(results, config, cache_folder)
+            stages["upload_unchanged"] = measure(lambda: upload_schedules(results, config, cache_folder), repeat)
+        finally:
+            if token is None:
+                del os.environ["SHAREPOINT_ACCESS_TOKEN"]
+            else:
+                os.environ["SHAREPOINT_ACCESS_TOKEN"] = token
+    stages["upload"]["items"] = stages["upload_unchanged"]["items"] = len(results)
+    return stages
+
+
+def scenario_key(scenario):
+    return json.dumps(scenario, sort_keys=True)
+
+
+def compare(results, baseline_path):
+    """
+    Print the stages that got slower (or faster) than in the baseline results.
+    Returns the number of regressions.
+    """
+    with open(baseline_path) as f:
+        baseline = {scenario_key(r["scenario"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    for result in results:
+        before = baseline.get(scenario_key(result["scenario"]))
+        if before is None:
+            continue
+        for stage, numbers in result["stages"].items():
+            old = before["stages"].get(stage, {}).get("seconds_median")
+            new = numbers.get("seconds_median")
+            if not old or new is None:
+                continue
+            ratio = new / old
+            if ratio >= REGRESSION_RATIO:
+                regressions += 1
+                label = "SLOWER"
+            elif ratio <= 1 / REGRESSION_RATIO:
+                label = "faster"
+            else:
+                continue
+            print(f"{label}: {scenario_key(result['scenario'])} {stage}: {old * 1000:.1f} ms -> {new * 1000:.1f} ms ({ratio:.2f}x)")
+    print(f"{regressions} stage(s) slower than {baseline_path}.")
+    return regressions
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark each stage of making meeting schedules on synthetic data.")
+    arg_parser.add_argument("--meetings", type=int, nargs="+", default=[13, 52], help="Meetings in the Current sheet.")
+    arg_parser.add_argument("--rows", type=int, nargs="+", default=[6], help="Agenda rows per meeting.")
+    arg_parser.add_argument("--sheets", type=int, nargs="+", default=[1, 8], help="Sheets in the workbook (older quarters plus Current).")
+    arg_parser.add_argument("--date-formats", nargs="+", default=["date", "mixed"], choices=list(DATE_FORMATS) + ["mixed"],
+                            help="How meeting dates are written in the workbook.")
+    arg_parser.add_argument("--template-paragraphs", type=int, default=8, help="Filler paragraphs in the template.")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage.")
+    arg_parser.add_argument("--pdf", type=int, default=0, metavar="N", help="Also time PDF export of N schedules per scenario.")
+    arg_parser.add_argument("--output", default="benchmark_results.json", help="Where to write the results.")
+    arg_parser.add_argument("--baseline", metavar="JSON", help="Earlier results to compare against.")
+    args = arg_parser.parse_args(argv)
+
+    results = []
+    for meetings, rows, sheets, date_format in itertools.product(args.meetings, args.rows, args.sheets, args.date_formats):
+        scenario = {
+            "meetings": meetings,
+            "rows_per_meeting": rows,
+            "sheets": sheets,
+            "date_format": date_format,
+            "template_paragraphs": args.template_paragraphs,
+        }
+        with tempfile.TemporaryDirectory() as folder:
+            result = run_scenario(scenario, folder, args.repeat, args.pdf)
+        results.append(result)
+        summary = ", ".join(f"{stage} {numbers['seconds_median'] * 1000:.1f} ms"
+                            for stage, numbers in result["stages"].items() if "seconds_median" in numbers)
+        print(f"{scenario_key(scenario)}: {summary}")
+
+    output = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=4)
+    print(f"Results written to {args.output}.")
+
+    if args.baseline:
+        return 1 if compare(results, args.baseline) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
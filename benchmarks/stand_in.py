@@ -0,0 +1,233 @@
+"""
+Local HTTP servers that stand in for SharePoint, for timing and trying out downloads and uploads
+without a network.
+
+serve_folder serves files the way a SharePoint download link does: ETags and 304 Not Modified,
+Range and If-Range requests, and connections that drop partway through.
+
+    with serve_folder(folder, drop_after=100_000) as (base_url, server):
+        download_with_retries(base_url + "/workbook.xlsx", buffer, "Downloading", session)
+
+serve_sharepoint answers the SharePoint REST calls the uploader makes (creating folders, adding
+files, upload sessions and file ETags), keeping the files in memory. It accepts the access token
+it was given, so the uploader signs in with SHAREPOINT_ACCESS_TOKEN.
+
+    with serve_sharepoint() as (site_url, server):
+        os.environ["SHAREPOINT_ACCESS_TOKEN"] = server.access_token
+        upload_schedules(results, dict(config, sharepoint_site_url=site_url), cache_folder)
+"""
+import contextlib
+import hashlib
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+CONTENT_TYPES = {
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".html": "text/html; charset=utf-8",
+}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        ...  # Keep the benchmark output clean
+
+    def do_GET(self):
+        server = self.server
+        path = os.path.join(server.folder, unquote(urlparse(self.path).path).lstrip("/"))
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        with open(path, "rb") as f:
+            data = f.read()
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        content_type = CONTENT_TYPES.get(os.path.splitext(path)[1], "application/octet-stream")
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start = 0
+        status = 200
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if match and self.headers.get("If-Range", etag) == etag:
+            start = int(match.group(1))
+            if start >= len(data):
+                self.send_error(416)
+                return
+            status = 206
+        body = data[start:]
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        self.end_headers()
+
+        with server.lock:
+            drop = server.drops > 0 and len(body) > server.drop_after
+            if drop:
+                server.drops -= 1
+        if drop:
+            # Send part of the file, then hang up like a dropped connection
+            self.wfile.write(body[:server.drop_after])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+class SharePointStandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        ...  # Keep the benchmark output clean
+
+    def send_json(self, status, value):
+        body = json.dumps(value).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;odata=verbose")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_json(status, {"error": {"code": str(status), "message": {"lang": "en-US", "value": message}}})
+
+    def file_properties(self, path):
+        data = self.server.files[path]
+        etag = f'"{{{hashlib.md5(data).hexdigest()}}},1"'
+        return {"d": {"ServerRelativeUrl": path, "Name": path.rsplit("/", 1)[1], "Length": str(len(data)), "ETag": etag}}
+
+    def do_GET(self):
+        self.handle_api()
+
+    def do_POST(self):
+        self.handle_api()
+
+    def handle_api(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        path = unquote(urlparse(self.path).path)
+        if self.headers.get("Authorization") != f"Bearer {server.access_token}":
+            self.send_error_json(401, "Access denied.")
+            return
+        prefix = f"{server.site_path}/_api/"
+        if not path.startswith(prefix):
+            self.send_error_json(404, "Not found.")
+            return
+        api = path[len(prefix):]
+        with server.lock:
+            server.requests.append((self.command, api))
+            if api.lower() == "contextinfo":
+                self.send_json(200, {"d": {"GetContextWebInformation": {"FormDigestValue": "stand-in", "FormDigestTimeoutSeconds": 1800}}})
+                return
+
+            # Web/GetFileByServerRelativePath(DecodedUrl='...') and the upload session calls on it
+            match = re.match(r"Web/GetFileByServerRelative(?:Path\(DecodedUrl=|Url\()'([^']*)'\)(.*)$", api, re.I)
+            if match:
+                file_path, rest = match.groups()
+                if not rest:
+                    if file_path in server.files:
+                        self.send_json(200, self.file_properties(file_path))
+                    else:
+                        self.send_error_json(404, "File Not Found.")
+                    return
+                match = re.match(r"/(StartUpload|ContinueUpload|FinishUpload)\(uploadId=(?:guid)?'([^']*)'", rest, re.I)
+                if match:
+                    call, upload_id = match.group(1).lower(), match.group(2)
+                    if call == "startupload":
+                        server.uploads[upload_id] = bytearray()
+                    if upload_id not in server.uploads:
+                        self.send_error_json(400, "Unknown upload session.")
+                        return
+                    server.uploads[upload_id] += body
+                    if call == "finishupload":
+                        server.files[file_path] = bytes(server.uploads.pop(upload_id))
+                        self.send_json(200, self.file_properties(file_path))
+                    else:
+                        key = "StartUpload" if call == "startupload" else "ContinueUpload"
+                        self.send_json(200, {"d": {key: str(len(server.uploads[upload_id]))}})
+                    return
+
+            # Web/RootFolder or Web/GetFolderByServerRelativePath(DecodedUrl='...'), then
+            # Folders('name') or Folders/Add('name') steps, then maybe Files/add(...)
+            match = re.match(r"Web/GetFolderByServerRelative(?:Path\(DecodedUrl=|Url\()'([^']*)'\)(.*)$", api, re.I)
+            if match:
+                folder, rest = match.groups()
+            else:
+                match = re.match(r"Web/RootFolder(.*)$", api, re.I)
+                if not match:
+                    self.send_error_json(400, f"The stand-in doesn't handle {api}.")
+                    return
+                folder, rest = server.site_path, match.group(1)
+            steps = re.findall(r"Folders(/Add)?\('([^']*)'\)", rest, re.I)
+            for add, name in steps:
+                parent, folder = folder, f"{folder}/{name}"
+                if add:
+                    if parent not in server.folders:
+                        self.send_error_json(404, f"Folder {parent} not found.")
+                        return
+                    server.folders.add(folder)
+            if folder not in server.folders:
+                self.send_error_json(404, f"Folder {folder} not found.")
+                return
+            match = re.search(r"/Files/add\(overwrite=true,url='([^']*)'\)$", rest, re.I)
+            if match:
+                file_path = f"{folder}/{match.group(1)}"
+                server.files[file_path] = body
+                self.send_json(200, self.file_properties(file_path))
+                return
+            self.send_json(200, {"d": {"ServerRelativeUrl": folder, "Name": folder.rsplit("/", 1)[1]}})
+
+
+@contextlib.contextmanager
+def _serve(handler, **attributes):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    for name, value in attributes.items():
+        setattr(server, name, value)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextlib.contextmanager
+def serve_folder(folder, drop_after=None, drops=1):
+    """
+    Serve the files in folder on a free local port while in the with block, which gets the base URL
+    and the server.
+    With drop_after, the first `drops` responses longer than that many bytes stop after sending them.
+    The server's drops attribute can be set again to drop more.
+    """
+    with _serve(StandInHandler, folder=folder, drop_after=drop_after or 0, drops=drops if drop_after else 0) as server:
+        yield f"http://127.0.0.1:{server.server_port}", server
+
+
+@contextlib.contextmanager
+def serve_sharepoint(site_path="/sites/squadron", access_token="stand-in"):
+    """
+    Stand in for a SharePoint site on a free local port while in the with block, which gets the
+    site URL and the server. The server's files ({server relative path: bytes}), folders and
+    requests ([(method, api path), ...]) show what the uploader did.
+    """
+    with _serve(SharePointStandInHandler, site_path=site_path, access_token=access_token,
+                folders={site_path}, files={}, uploads={}, requests=[]) as server:
+        yield f"http://127.0.0.1:{server.server_port}{site_path}", server
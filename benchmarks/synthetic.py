@@ -0,0 +1,108 @@
+"""
+Synthetic master spreadsheets and meeting schedule templates for the benchmarks.
+They're laid out like master_spreadsheet.xlsx and Meeting Schedule Template.docx, but can be made
+as big as needed.
+"""
+import random
+from datetime import datetime, timedelta
+
+import openpyxl
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.shared import Pt
+
+# How the date in each meeting's "Meeting" cell is written
+DATE_FORMATS = {
+    "date": None,  # A real Excel date
+    "us": "%m/%d/%Y",  # Text like 05/19/2025
+    "long": "%B %d, %Y",  # Text like May 19, 2025
+    "weekday": "%A, %b %d %Y",  # Text like Monday, May 19 2025 (only the fuzzy parser reads these)
+}
+
+UNIFORMS = ["ABU", "ABUs (sleeves rolled)", "ABUs (sleeves down)", "PT", "Blues", "Blues with Tie"]
+CLASSES = ["Opening", "Aerospace", "Drill", "Leadership", "Character Development", "Emergency Services",
+           "Safety Briefing", "PT", "Promotions", "Closing", "Dismissal"]
+INSTRUCTORS = ["First Sergeant", "Flight Staff", "C/CC", "C/CD", "Capt Smith", "Lt Jones", ""]
+
+
+def _date_cell(meeting_date, date_format, rng):
+    if date_format == "mixed":
+        date_format = rng.choice(list(DATE_FORMATS))
+    pattern = DATE_FORMATS[date_format]
+    return meeting_date if pattern is None else meeting_date.strftime(pattern)
+
+
+def make_workbook(path, meetings=13, rows_per_meeting=6, sheets=1, date_format="date", title_rows=0,
+                  notes=True, seed=0):
+    """
+    Write a workbook whose "Current" sheet has `meetings` weekly meeting blocks of `rows_per_meeting`
+    agenda rows each. sheets - 1 older sheets of the same size are added before it, like a workbook
+    that keeps past quarters. date_format is one of DATE_FORMATS or "mixed". title_rows blank/title
+    rows go above the header, and notes adds a free-form notes column.
+    Returns the dates of the meetings in the "Current" sheet.
+    """
+    rng = random.Random(seed)
+    workbook = openpyxl.Workbook(write_only=True)
+    start = datetime(2025, 1, 6)
+    dates = []
+    for sheet in range(sheets):
+        current = sheet == sheets - 1
+        ws = workbook.create_sheet("Current" if current else f"Q{sheet + 1} Archive")
+        for i in range(title_rows):
+            ws.append(["Three Month Schedule" if i == 0 else None])
+        header = ["Meeting", "Class", "Topic", "Time", "Instructor"] + (["Notes"] if notes else [])
+        ws.append(header)
+        sheet_start = start + timedelta(weeks=sheet * meetings)
+        for m in range(meetings):
+            meeting_date = sheet_start + timedelta(weeks=m)
+            if current:
+                dates.append(meeting_date)
+            minutes = 18 * 60 + 30
+            for row in range(rows_per_meeting):
+                if row == 0:
+                    first = _date_cell(meeting_date, date_format, rng)
+                elif row == 1:
+                    first = rng.choice(UNIFORMS)
+                else:
+                    first = None
+                length = rng.choice([5, 15, 25, 35, 45])
+                time_range = f"{minutes // 60:02d}{minutes % 60:02d}-{(minutes + length) // 60:02d}{(minutes + length) % 60:02d}"
+                minutes += length
+                cells = [
+                    first,
+                    rng.choice(CLASSES),
+                    rng.choice([None, "Meeting opening", "Flights will conduct drill", "Announcements and Clean-up",
+                                "Chapter 3 review\nBring your books"]),
+                    time_range,
+                    rng.choice(INSTRUCTORS) or None,
+                ]
+                if notes:
+                    cells.append(rng.choice([None, "\xa0", "Room 2", "Check with the CDC"]))
+                ws.append(cells)
+            ws.append([None] * len(header))
+    workbook.save(path)
+    return dates
+
+
+def make_template(path, paragraphs=8, split_runs=True, drill_phrase=None):
+    """
+    Write a meeting schedule template with [Date] and [UNIFORM] placeholders and `paragraphs`
+    paragraphs of filler text. With split_runs, the placeholders are split across several runs
+    the way Word often saves them. drill_phrase, if given, is included as its own paragraph.
+    """
+    doc = Document()
+    title = doc.add_paragraph()
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    pieces = ["Meeting Schedule for ", "[", "Da", "te]", ", 2025"] if split_runs else ["Meeting Schedule for [Date], 2025"]
+    for piece in pieces:
+        run = title.add_run(piece)
+        run.bold = True
+        run.font.size = Pt(20)
+    uniform = doc.add_paragraph()
+    for piece in (["Uniform of the Day: ", "[UNI", "FORM]"] if split_runs else ["Uniform of the Day: [UNIFORM]"]):
+        uniform.add_run(piece).font.size = Pt(16)
+    for i in range(paragraphs):
+        doc.add_paragraph(f"Reminder {i + 1}: bring your CAPID, water and a notebook to every meeting.")
+    if drill_phrase:
+        doc.add_paragraph(drill_phrase)
+    doc.save(path)
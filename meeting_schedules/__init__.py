@@ -0,0 +1,10 @@
+"""
+Generates Civil Air Patrol meeting schedules from the master three month schedule spreadsheet.
+
+Run it with `python automated_meeting_schedules.py` or `python -m meeting_schedules`, or call main()
+from another program. Importing the package is cheap: the heavy dependencies (pandas, python-docx,
+requests, ...) are only imported by the modules that need them.
+"""
+from .cli import main
+
+__all__ = ["main"]
@@ -0,0 +1,204 @@
+"""
+Finds meetings across every sheet of every workbook in a folder (archived quarters and several
+squadrons side by side) and keeps them in one catalog indexed by date.
+
+Each catalog entry knows its squadron (the workbook's path in the folder, without the extension,
+e.g. "Squadron A" or "2025/Squadron A"), sheet and row range, and carries the
+whole meeting block, so schedules can be rendered from the catalog without opening the workbooks
+again. Workbooks are only read when they changed since the last scan: each one's sheets are
+cached under its content hash, and a file whose size and modification time haven't changed isn't
+even read to hash it.
+"""
+import hashlib
+import io
+import json
+import os
+import pickle
+
+from . import telemetry
+from .files import write_file_atomic
+from .spreadsheet import build_meeting_index, stream_sheet
+
+# Bump when the layout of the cached workbook sheets changes
+CATALOG_VERSION = 1
+WORKBOOK_EXTENSIONS = (".xlsx", ".xlsm")
+
+
+def find_workbooks(folder):
+    """
+    Every workbook in folder and its subfolders, skipping the lock files Excel leaves next to open ones.
+    """
+    workbooks = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for file_name in sorted(files):
+            if file_name.lower().endswith(WORKBOOK_EXTENSIONS) and not file_name.startswith("~$"):
+                workbooks.append(os.path.join(root, file_name))
+    return workbooks
+
+
+def squadron_name(workbook_path, folder):
+    """
+    The squadron a workbook in folder stands for: its path below folder without the extension, with
+    / between folders. Workbooks with the same file name in different subfolders stay apart.
+    """
+    relative = os.path.relpath(os.path.abspath(workbook_path), os.path.abspath(folder))
+    return os.path.splitext(relative)[0].replace(os.sep, "/")
+
+
+def spreadsheet_squadrons(spreadsheet_paths):
+    """
+    {path: squadron} for workbooks given one by one (--spreadsheets): each one's path below the
+    folder they're all in (see squadron_name), so workbooks in the same folder are named after
+    their file and same-named ones in different folders stay apart.
+    """
+    folders = [os.path.dirname(os.path.abspath(path)) for path in spreadsheet_paths]
+    try:
+        folder = os.path.commonpath(folders) if folders else ""
+    except ValueError:
+        # On different drives there's no folder they're all in
+        return {path: squadron_name(path, os.path.splitdrive(os.path.abspath(path))[0] + os.sep)
+                for path in spreadsheet_paths}
+    return {path: squadron_name(path, folder) for path in spreadsheet_paths}
+
+
+def index_workbook(data, name):
+    """
+    The meeting index of every sheet in a workbook (its bytes) that has a meeting table, in sheet
+    order: [(sheet name, {date: meeting}), ...]. Sheets without a header row are skipped.
+    """
+    import openpyxl
+
+    sheets = []
+    workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            try:
+                df, _, row_numbers = stream_sheet(worksheet, name=f"{name}/{worksheet.title}")
+            except ValueError:
+                continue
+            sheets.append((worksheet.title, build_meeting_index(df, row_numbers)))
+    finally:
+        workbook.close()
+    return sheets
+
+
+class MeetingCatalog:
+    """
+    The meetings of a set of workbooks, indexed by date. Each entry is a dict with the meeting's
+    "date" (a date), "squadron", "workbook" (path), "sheet", "rows" (first and last sheet row of
+    the block) and the "meeting" itself, ready to render.
+    """
+
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=lambda entry: (entry["date"], entry["squadron"], entry["sheet"]))
+        self.by_date = {}
+        for entry in self.entries:
+            self.by_date.setdefault(entry["date"], []).append(entry)
+
+    def query(self, dates=None, squadrons=None, sheets=None):
+        """
+        The entries on the given dates, for the given squadrons and in the given sheets (all if None).
+        Squadron and sheet names are matched ignoring case.
+        """
+        entries = self.entries if dates is None else [entry for d in sorted(dates) for entry in self.by_date.get(d, [])]
+        if squadrons is not None:
+            wanted = {squadron.lower() for squadron in squadrons}
+            entries = [entry for entry in entries if entry["squadron"].lower() in wanted]
+        if sheets is not None:
+            wanted = {sheet.lower() for sheet in sheets}
+            entries = [entry for entry in entries if entry["sheet"].lower() in wanted]
+        return entries
+
+    def select(self, dates=None, squadrons=None, sheets=None):
+        """
+        One entry per squadron and date, for rendering. When a squadron has the same date in more
+        than one sheet, the "Current" sheet wins, then the sheet furthest along in the workbook.
+        """
+        chosen = {}
+        for entry in self.query(dates, squadrons, sheets):
+            key = (entry["squadron"], entry["date"])
+            if key not in chosen or _sheet_rank(entry) > _sheet_rank(chosen[key]):
+                chosen[key] = entry
+        return sorted(chosen.values(), key=lambda entry: (entry["squadron"], entry["date"]))
+
+
+def _sheet_rank(entry):
+    return (entry["sheet"].strip().lower() == "current", entry["sheet_position"])
+
+
+def build_catalog(folder, cache_folder=None):
+    """
+    Scan every sheet of every workbook in folder (see find_workbooks) into a MeetingCatalog.
+    """
+    stamps_path = os.path.join(cache_folder, "catalog", "stamps.json") if cache_folder else None
+    stamps = {}
+    if stamps_path and os.path.isfile(stamps_path):
+        try:
+            with open(stamps_path) as f:
+                stamps = json.load(f)
+        except Exception:
+            stamps = {}
+
+    entries = []
+    new_stamps = dict(stamps)
+    for workbook_path in find_workbooks(folder):
+        name = os.path.basename(workbook_path)
+        stat = os.stat(workbook_path)
+        stamp = stamps.get(os.path.abspath(workbook_path))
+        data = None
+        if stamp and stamp["size"] == stat.st_size and stamp["mtime_ns"] == stat.st_mtime_ns:
+            digest = stamp["digest"]
+        else:
+            with open(workbook_path, "rb") as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+        new_stamps[os.path.abspath(workbook_path)] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": digest}
+
+        sheets = None
+        cache_path = os.path.join(cache_folder, "catalog", f"v{CATALOG_VERSION}-{digest}.pickle") if cache_folder else None
+        if cache_path and os.path.isfile(cache_path):
+            try:
+                with open(cache_path, "rb") as f:
+                    sheets = pickle.load(f)
+            except Exception:
+                ...  # Unreadable cache entry, read the workbook again below
+        if sheets is None:
+            if data is None:
+                with open(workbook_path, "rb") as f:
+                    data = f.read()
+            try:
+                with telemetry.stage("workbook_parse", file=name) as span:
+                    span.bytes = len(data)
+                    sheets = index_workbook(data, name)
+            except Exception as e:
+                print(f"⚠️ Skipping {name}: {e}")
+                new_stamps.pop(os.path.abspath(workbook_path), None)
+                continue
+            if cache_path:
+                try:
+                    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                    write_file_atomic(cache_path, pickle.dumps(sheets))
+                except Exception as e:
+                    print(f"Could not cache the meetings of {name}: {e}")
+
+        squadron = squadron_name(workbook_path, folder)
+        for sheet_position, (sheet_name, index) in enumerate(sheets):
+            for meeting_date, meeting in index.items():
+                entries.append({
+                    "date": meeting_date,
+                    "squadron": squadron,
+                    "workbook": workbook_path,
+                    "sheet": sheet_name,
+                    "sheet_position": sheet_position,
+                    "rows": meeting.get("rows"),
+                    "meeting": meeting,
+                })
+
+    if stamps_path and new_stamps != stamps:
+        try:
+            os.makedirs(os.path.dirname(stamps_path), exist_ok=True)
+            write_file_atomic(stamps_path, json.dumps(new_stamps, indent=4).encode())
+        except Exception as e:
+            print(f"Could not save the workbook catalog: {e}")
+    return MeetingCatalog(entries)
@@ -0,0 +1,534 @@
+import argparse
+import os
+import random
+import re
+import sys
+from datetime import datetime
+
+from . import telemetry
+from .config import load_config, script_dir
+
+# Only the standard library is imported up here. pandas, python-docx, requests and the rest are
+# imported by the steps that need them, so --help and offline runs don't pay for what they don't use.
+
+
+# A full MM-DD-YYYY (or M-D-YY) date anywhere in a template file name
+FILENAME_DATE_PATTERN = re.compile(r'(\d{1,2})-(\d{1,2})-(\d{2,4})')
+
+
+def parse_date_text(text):
+    """
+    Turn MM-DD-YYYY (or MM-DD, or just MM, filling in the current year) into a datetime.
+    Raises ValueError if it isn't a date.
+    """
+    # Split and fill in missing parts
+    parts = text.strip().split('-')
+    now = datetime.now()
+    if len(parts) == 3:
+        month, day, year = parts
+    elif len(parts) == 2:
+        month, day = parts
+        year = str(now.year)
+    elif len(parts) == 1 and parts[0]:
+        month = parts[0]
+        day = "01"
+        year = str(now.year)
+    else:
+        raise ValueError(f"'{text}' is not a date")
+    month = month.zfill(2)
+    day = day.zfill(2)
+    if len(year) == 2:
+        year = "20" + year
+    return datetime.strptime(f"{month}-{day}-{year}", "%m-%d-%Y")
+
+
+def parse_target_date(meeting_schedule_filename, date_text=None):
+    """
+    Get the meeting date from --date, the template file name, or prompt for it.
+    """
+    if date_text:
+        try:
+            return parse_date_text(date_text)
+        except ValueError:
+            print(f"Invalid date '{date_text}'. Please enter it as MM-DD-YYYY.")
+            sys.exit(1)
+
+    date_match = FILENAME_DATE_PATTERN.search(meeting_schedule_filename)
+    if date_match:
+        return parse_date_text(date_match.group(0))
+
+    # Prompt user for date
+    while True:
+        user_date = input("Enter the meeting date (MM-DD-YYYY): ")
+        try:
+            return parse_date_text(user_date)
+        except ValueError:
+            print("Invalid date format. Please enter as MM-DD-YYYY.")
+
+
+def confirm(question, assume_yes=False):
+    """
+    Ask a yes/no question. With --yes it's answered yes without waiting for input.
+    """
+    if assume_yes:
+        print(f"{question}Y")
+        return True
+    return input(question).strip().upper() in ("Y", "YES")
+
+
+def upload_results(results, config, cache_folder):
+    """
+    Upload the generated schedules to SharePoint and print how it went. A failed upload doesn't stop the run.
+    """
+    from .uploads import upload_schedules
+
+    try:
+        uploaded, unchanged, failed = upload_schedules(results, config, cache_folder, max_workers=config.get("upload_workers", 4))
+    except Exception as e:
+        print(f"⚠️ Could not upload the schedules to SharePoint: {e}")
+        return
+    print(f"Uploaded {uploaded} file(s) to SharePoint"
+          f"{f', {unchanged} already up to date' if unchanged else ''}{f', {failed} failed' if failed else ''}.")
+
+
+def query_schedules(args, config, cache_folder, spreadsheets, download_spreadsheet, uniform_rules):
+    """
+    Bring the schedule store up to date with the whole quarter of every spreadsheet, then print the
+    meetings and agenda rows asked for with --query.
+    """
+    import time
+
+    from .catalog import spreadsheet_squadrons
+    from .spreadsheet import load_meeting_index
+    from .store import ScheduleStore, store_path, workbook_key
+
+    if download_spreadsheet:
+        from .downloads import DownloadCache, download_and_index_spreadsheet, make_download_session
+
+        session = make_download_session()
+        download_cache = DownloadCache(cache_folder, max_bytes=config.get("download_cache_max_mb", 200) * 1024 * 1024)
+    for spreadsheet_path in spreadsheets:
+        try:
+            if download_spreadsheet:
+                download_and_index_spreadsheet(config["master_spreadsheet_url"], spreadsheet_path, session,
+                                               cache_folder, cache=download_cache, refresh=args.refresh)
+            else:
+                load_meeting_index(spreadsheet_path, cache_folder)
+        except Exception as e:
+            print(f"⚠️ Error: {spreadsheet_path}: {e}")
+    if download_spreadsheet:
+        session.close()
+
+    dates = {parse_target_date("", args.date).date()} if args.date else None
+    # Squadrons are named like their output folders, so same-named workbooks in different folders stay apart
+    squadrons = {workbook_key(path): squadron for path, squadron in spreadsheet_squadrons(spreadsheets).items()}
+    if args.squadron:
+        wanted = {squadron.lower() for squadron in args.squadron}
+        squadrons = {key: squadron for key, squadron in squadrons.items() if squadron.lower() in wanted}
+    start = time.perf_counter()
+    with ScheduleStore(store_path(cache_folder)) as store:
+        rows = store.find(dates, list(squadrons), args.class_name, args.instructor)
+    elapsed = time.perf_counter() - start
+
+    meeting = None
+    for row in rows:
+        if (row["date"], row["workbook"]) != meeting:
+            meeting = (row["date"], row["workbook"])
+            # The uniform as the schedule shows it, when the rules can tell without asking about ABU sleeves
+            uniform = uniform_rules.classify(row["uniform"])
+            print(f"{row['date'].strftime('%m-%d-%Y')}  {squadrons[row['workbook']]}  Uniform: {uniform if isinstance(uniform, str) else row['uniform']}")
+        print("    " + " | ".join(row[column] or "" for column in ("Class", "Topic", "Time", "Instructor")))
+    print(f"{len(rows)} agenda row(s) found in {elapsed * 1000:.1f} ms.")
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(description="Generate Civil Air Patrol meeting schedules from the master spreadsheet.")
+    arg_parser.add_argument("--batch", action="store_true",
+                            help="Generate a schedule for every meeting in the \"Current\" sheet in one run.")
+    arg_parser.add_argument("--spreadsheets", nargs="+", metavar="XLSX",
+                            help="Use these workbooks (one per squadron) instead of the master spreadsheet. "
+                                 "Schedules are saved in a subfolder of base_meetings_folder named after each workbook "
+                                 "(with its folder in front when same-named workbooks are in different folders).")
+    arg_parser.add_argument("--discover", metavar="FOLDER",
+                            help="Find meetings in every sheet of every workbook in FOLDER (one workbook per squadron, "
+                                 "archived quarters included) instead of using the master spreadsheet.")
+    arg_parser.add_argument("--squadron", nargs="+", metavar="NAME",
+                            help="With --discover or --query, only use these squadrons' workbooks (named without .xlsx).")
+    arg_parser.add_argument("--sheet", nargs="+", metavar="NAME",
+                            help="With --discover, only use meetings from these sheets (e.g. Current).")
+    arg_parser.add_argument("--list-meetings", action="store_true",
+                            help="With --discover, list the meetings found (date, squadron, sheet and rows) and exit.")
+    arg_parser.add_argument("--query", action="store_true",
+                            help="Look up meetings in the schedule store instead of making schedules, filtered by --date, "
+                                 "--class, --instructor and --squadron. The spreadsheets are read first, so the store has the whole quarter.")
+    arg_parser.add_argument("--class", dest="class_name", metavar="NAME",
+                            help="With --query, only agenda rows of this class (ignoring case; %% matches anything).")
+    arg_parser.add_argument("--instructor", metavar="NAME",
+                            help="With --query, only agenda rows taught by this instructor (ignoring case; %% matches anything).")
+    arg_parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                            help="Number of worker processes used to render and export schedules (default: 1).")
+    arg_parser.add_argument("--refresh", action="store_true",
+                            help="Download the master spreadsheet and template again even if the cached copies are up to date.")
+    arg_parser.add_argument("--rebuild", action="store_true",
+                            help="Make every schedule again, even ones already made from the same meeting, template and preferences.")
+    arg_parser.add_argument("--upload", action="store_true",
+                            help="Upload the schedules to the meeting folders on SharePoint (default: upload_to_sharepoint in the preferences).")
+    arg_parser.add_argument("--watch", action="store_true",
+                            help="Keep running and regenerate the schedules whose meetings change in the spreadsheet.")
+    arg_parser.add_argument("--interval", type=float, metavar="SECONDS",
+                            help="How often --watch checks the spreadsheet for changes (default: watch_interval, or 30).")
+
+    # Answers to the questions the script would otherwise ask, so it can run without anyone at the keyboard
+    arg_parser.add_argument("--config", metavar="JSON",
+                            help="Preferences file to use (default: automated_meeting_schedules_preferences.json next to the script).")
+    arg_parser.add_argument("--template", metavar="DOCX",
+                            help="Meeting schedule template to use instead of searching for one "
+                                 "(default: meeting_schedule_template in the preferences).")
+    arg_parser.add_argument("--download-template", action="store_true",
+                            help="In online mode, always download the template instead of offering local ones.")
+    arg_parser.add_argument("--date", metavar="MM-DD-YYYY",
+                            help="Meeting date to generate the schedule for (default: the date in the template name, or ask).")
+    arg_parser.add_argument("--abu-sleeves", choices=["rolled", "down"],
+                            help="Sleeves for meetings whose uniform is just \"ABU\" (default: abu_sleeves in the preferences, or ask).")
+    arg_parser.add_argument("-y", "--yes", action="store_true",
+                            help="Answer yes to every confirmation (use the template found, save, create missing folders).")
+
+    arg_parser.add_argument("--telemetry-log", metavar="JSONL",
+                            help="Append the time, bytes and peak memory of every stage to this file as JSON lines "
+                                 "(default: telemetry_log in the preferences).")
+    arg_parser.add_argument("--prometheus-file", metavar="PROM",
+                            help="Write per-stage totals to this file in the Prometheus text format "
+                                 "(default: prometheus_textfile in the preferences).")
+    return arg_parser
+
+
+def main(argv=None):
+    arg_parser = build_arg_parser()
+    args = arg_parser.parse_args(argv)
+    if not args.discover and (args.sheet or args.list_meetings):
+        arg_parser.error("--sheet and --list-meetings need --discover")
+    if not (args.discover or args.query) and args.squadron:
+        arg_parser.error("--squadron needs --discover or --query")
+    if not args.query and (args.class_name or args.instructor):
+        arg_parser.error("--class and --instructor need --query")
+    if args.discover and (args.spreadsheets or args.watch or args.query):
+        arg_parser.error("--discover can't be used with --spreadsheets, --watch or --query")
+    if args.query and args.watch:
+        arg_parser.error("--query can't be used with --watch")
+    try:
+        config = load_config(args.config)
+    except OSError as e:
+        print(f"Could not read the preferences file: {e}")
+        sys.exit(1)
+    try:
+        run(args, config)
+    except EOFError:
+        # input() with nothing to read, e.g. when run from cron or another program
+        print("\nThe script needed an answer but there is no one to ask. "
+              "Use --yes, --template, --date and --abu-sleeves (or their preferences) to run without prompts.")
+        sys.exit(1)
+
+
+def run(args, config):
+    from .catalog import spreadsheet_squadrons
+    from .spreadsheet import load_meeting_index
+    from .uniforms import load_uniform_rules
+
+    base_meetings_folder = config["base_meetings_folder"]
+    master_spreadsheet_url = config["master_spreadsheet_url"]
+    meeting_schedule_template_url = config["meeting_schedule_template_url"]
+    cache_folder = config.get("cache_folder") or os.path.join(script_dir, ".cache")
+    abu_sleeves = args.abu_sleeves or config.get("abu_sleeves")
+    template_option = args.template or config.get("meeting_schedule_template")
+    interval = args.interval or config.get("watch_interval", 30)
+    telemetry_log = args.telemetry_log or config.get("telemetry_log")
+    prometheus_file = args.prometheus_file or config.get("prometheus_textfile")
+    upload = args.upload or config.get("upload_to_sharepoint")
+    if telemetry_log or prometheus_file:
+        telemetry.enable(telemetry_log)
+    try:
+        uniform_rules = load_uniform_rules(config, abu_sleeves)
+    except ValueError as e:
+        print(f"Check uniform_rules and abu_sleeves in the preferences file: {e}")
+        sys.exit(1)
+
+    # --- Prompt for the best NCSA if configured ---
+    try:
+        if config.get("include_NCSA_prompt") and not args.yes and random.randint(1, 100) == 1: # 1% chance to show NCSA prompt
+            response = input("What is the better NCSA, NBB or Hawk? ").strip()
+            if (response.strip().upper() != "NBB") and ("blue beret" not in response.lower()):
+                print("Wrong answer. Exiting.")
+                sys.exit()
+    except KeyError:
+        ...
+
+    # --- Master spreadsheet ---
+    master_spreadsheet_path = os.path.join(script_dir, "master_spreadsheet.xlsx")
+    online = not config.get("run_in_offline_mode")
+    download_spreadsheet = online and not args.spreadsheets and not args.discover
+    spreadsheets = args.spreadsheets or [master_spreadsheet_path]
+
+    if args.discover:
+        if not os.path.isdir(args.discover):
+            print(f"Folder '{args.discover}' not found. Exiting.")
+            sys.exit(1)
+        print(f"Looking for meetings in every workbook in {args.discover}. Skipping the master spreadsheet.")
+        if args.list_meetings:
+            from .catalog import build_catalog
+
+            dates = {parse_target_date("", args.date).date()} if args.date else None
+            entries = build_catalog(args.discover, cache_folder).query(dates, args.squadron, args.sheet)
+            for entry in entries:
+                print(f"{entry['date'].strftime('%m-%d-%Y')}  {entry['squadron']}  {entry['sheet']}  rows {entry['rows'][0]}-{entry['rows'][1]}")
+            print(f"{len(entries)} meeting(s).")
+            return
+    elif args.spreadsheets:
+        print(f"Using the {len(args.spreadsheets)} workbook(s) given on the command line. Skipping the master spreadsheet.")
+    elif not online:
+        print("Running in offline mode. Skipping SharePoint download.")
+        # Check if the master spreadsheet exists in script_dir
+        if not os.path.isfile(master_spreadsheet_path):
+            print(f"master_spreadsheet.xlsx not found. Please ensure it is located in {script_dir}.")
+            sys.exit()
+
+    if args.query:
+        query_schedules(args, config, cache_folder, spreadsheets, download_spreadsheet, uniform_rules)
+        return
+
+    # Only imported past the listing and lookup modes above, which don't render: these load python-docx and lxml
+    from .jobs import batch_save_path, generate_schedules, make_render_job
+    from .rendering import describe_meeting
+
+
+    # --- Meeting schedule file selection logic ---
+    meeting_schedule_filename = None
+    download_template = False
+
+    if template_option:
+        if not os.path.isfile(template_option):
+            print(f"File '{template_option}' not found. Exiting.")
+            sys.exit(1)
+        meeting_schedule_filename = os.path.abspath(template_option)
+    elif not online:
+        print("Running in offline mode. Skipping SharePoint download.")
+        # Search for a file containing "Meeting Schedule" in the name
+        for fname in os.listdir():
+            if "Meeting Schedule" in fname and fname.lower().endswith(".docx"):
+                if confirm(f"Use {fname} as the meeting schedule template? [Y/N]: ", args.yes):
+                    meeting_schedule_filename = fname
+                    break
+        # If not found, prompt the user for the file name
+        if not meeting_schedule_filename:
+            meeting_schedule_filename = input("Enter the full file name for the meeting schedule (including .docx): ").strip()
+            if not os.path.isfile(meeting_schedule_filename):
+                print(f"File '{meeting_schedule_filename}' not found. Exiting.")
+                sys.exit()
+    else:
+        # Online mode: download unless a local template is picked
+        if not args.download_template:
+            for fname in os.listdir():
+                if "Meeting Schedule" in fname and fname.lower().endswith(".docx"):
+                    if confirm(f"Use {fname} as the meeting schedule template? [Y/N]: ", args.yes):
+                        meeting_schedule_filename = fname
+                        break
+        download_template = not meeting_schedule_filename
+
+
+    # The meeting date is needed up front so a single-date run only reads the spreadsheet up to that meeting.
+    # A downloaded template is always saved as "Meeting Schedule.docx", which has no date in it.
+    target_date = None if args.batch else parse_target_date(os.path.basename(meeting_schedule_filename or "Meeting Schedule.docx"), args.date)
+    target_dates = None if target_date is None else {target_date.date()}
+
+    # --- Download from SharePoint and read the spreadsheets ---
+    # The spreadsheet and the template download at the same time over one pooled session.
+    # Each spreadsheet is parsed as soon as it's available, even if the template is still downloading.
+    from concurrent.futures import ThreadPoolExecutor
+
+    background = ThreadPoolExecutor(max_workers=4)
+    session = None
+    download_cache = None
+    if download_spreadsheet or download_template:
+        from .downloads import DownloadCache, download_and_index_spreadsheet, download_with_retries, make_download_session
+
+        print("Running in online mode. Downloading from SharePoint...")
+        session = make_download_session()
+        download_cache = DownloadCache(cache_folder, max_bytes=config.get("download_cache_max_mb", 200) * 1024 * 1024)
+
+    template_future = None
+    if download_template:
+        template_future = background.submit(download_with_retries, meeting_schedule_template_url, "Meeting Schedule.docx",
+                                            "Downloading meeting schedule template", session,
+                                            cache=download_cache, refresh=args.refresh, position=1)
+    if args.discover:
+        from .catalog import build_catalog
+
+        catalog_future = background.submit(build_catalog, args.discover, cache_folder)
+    elif download_spreadsheet:
+        index_futures = {master_spreadsheet_path: background.submit(
+            download_and_index_spreadsheet, master_spreadsheet_url, master_spreadsheet_path, session,
+            cache_folder, cache=download_cache, refresh=args.refresh, target_dates=target_dates)}
+    else:
+        index_futures = {path: background.submit(load_meeting_index, path, cache_folder, target_dates)
+                         for path in spreadsheets}
+
+    if template_future is not None:
+        import requests
+
+        try:
+            meeting_schedule_response = template_future.result()
+            downloaded = meeting_schedule_response.status_code in (200, 304)
+        except requests.exceptions.RequestException as e:
+            print(f"Failed to download the meeting schedule template: {e}")
+            downloaded = False
+        if downloaded:
+            print("Meeting schedule template downloaded successfully!")
+            meeting_schedule_filename = "Meeting Schedule.docx"
+        else:
+            meeting_schedule_filename = input("Enter the full file name for the meeting schedule template (including .docx): ").strip()
+            if not os.path.isfile(meeting_schedule_filename):
+                print(f"File '{meeting_schedule_filename}' not found. Exiting.")
+                sys.exit()
+    # The template is parsed once per process and copied in memory for every meeting that gets rendered
+    template_path = os.path.join(script_dir, meeting_schedule_filename)
+
+
+    # Every (spreadsheet, meeting) pair that needs a schedule
+    multi_squadron = len(spreadsheets) > 1
+    selected = []
+    # The squadron name of each workbook, for its save folder (see catalog.squadron_name)
+    squadron_names = spreadsheet_squadrons(spreadsheets)
+    if args.discover:
+        catalog = catalog_future.result()
+        squadrons = {entry["squadron"] for entry in catalog.query(squadrons=args.squadron, sheets=args.sheet)}
+        multi_squadron = len(squadrons) > 1
+        spreadsheets = []
+        entries = catalog.select(target_dates, args.squadron, args.sheet)
+        if target_date is not None:
+            for squadron in sorted(squadrons - {entry["squadron"] for entry in entries}):
+                print(f"No meeting found for {squadron} on {target_date.strftime('%m-%d-%Y')}.")
+        selected = [(entry["workbook"], entry["meeting"]) for entry in entries]
+        squadron_names = {entry["workbook"]: entry["squadron"] for entry in entries}
+    for spreadsheet_path in spreadsheets:
+        try:
+            meeting_index = index_futures[spreadsheet_path].result()
+        except Exception as e:
+            print(f"⚠️ Error: {spreadsheet_path}: {e}")
+            continue
+
+        if target_date is None:
+            meetings = list(meeting_index.values())
+        else:
+            meeting = meeting_index.get(target_date.date())
+            meetings = [meeting] if meeting else []
+            if not meetings:
+                print(f"No meeting found in {os.path.basename(spreadsheet_path)} for {target_date.strftime('%m-%d-%Y')}.")
+        selected.extend((spreadsheet_path, meeting) for meeting in meetings)
+    background.shutdown()
+
+    if not selected:
+        print("No meetings to generate. Exiting.")
+        sys.exit()
+    if args.batch:
+        print(f"Batch mode: found {len(selected)} meetings.")
+
+    # Uniforms are resolved up front since the workers can't prompt
+    for spreadsheet_path, meeting in selected:
+        describe_meeting(meeting)
+    uniform_rules.resolve([meeting for _, meeting in selected])
+
+    jobs = []
+    if not args.batch and not multi_squadron:
+        spreadsheet_path, meeting = selected[0]
+        save_file_date = meeting["date"].strftime("%m-%d-%Y")
+
+        if not confirm(f"File will be saved as {save_file_date} Meeting Schedule. Continue? [Y/N]: ", args.yes):
+            print("Operation cancelled by user. Exiting.")
+            sys.exit()
+
+
+        # Check if the current working directory's name matches save_file_date (is a meeting folder)
+        current_dir_name = os.path.basename(os.getcwd())
+        if current_dir_name == save_file_date:
+            print(f"I seem to be running in a meeting folder. I will save the document here.")
+            save_path = os.getcwd()
+        else:
+            print(f"Saving the document in the corrisponding folder specified in preferences.")
+
+            save_path = os.path.join(base_meetings_folder, save_file_date)
+            if not os.path.exists(save_path):
+                print(f"Unable to find a Meeting Schedules folder at {save_path}.")
+                if confirm(f"Create a new folder with this name ({save_file_date})? (otherwise the files will be saved locally to current directory) [Y/N]: ", args.yes):
+                    os.makedirs(save_path)
+                    print(f"Created folder: {save_path}")
+                else:
+                    print("Saving to the current directory instead.")
+                    save_path = os.getcwd()
+                    sys.exit()
+        jobs.append(make_render_job(spreadsheet_path, meeting, template_path, save_path, config, cache_folder))
+    else:
+        # One confirmation for the whole batch. Each schedule goes in its own meeting folder
+        # (inside a folder per workbook when there are several squadrons).
+        print(f"{len(selected)} schedules will be saved in {base_meetings_folder}:")
+        for spreadsheet_path, meeting in selected:
+            squadron = squadron_names[spreadsheet_path]
+            save_file_date = meeting["date"].strftime("%m-%d-%Y")
+            print(f"  {squadron + ': ' if multi_squadron else ''}{save_file_date} Meeting Schedule")
+        if not confirm("Continue? Missing meeting folders will be created. [Y/N]: ", args.yes):
+            print("Operation cancelled by user. Exiting.")
+            sys.exit()
+
+        for spreadsheet_path, meeting in selected:
+            save_path = batch_save_path(base_meetings_folder, meeting, multi_squadron, squadron_names[spreadsheet_path])
+            jobs.append(make_render_job(spreadsheet_path, meeting, template_path, save_path, config, cache_folder))
+
+    results = generate_schedules(jobs, config, max_workers=args.jobs, reuse_outputs=not args.rebuild)
+    if upload:
+        upload_results(results, config, cache_folder)
+    if prometheus_file:
+        telemetry.write_prometheus(prometheus_file)
+
+    if args.watch:
+        from .watch import spreadsheet_poller, watch_spreadsheets
+
+        # Only meetings whose blocks changed are rendered again. A single-date run keeps saving to the same folder.
+        pollers = {}
+        for spreadsheet_path in spreadsheets:
+            if download_spreadsheet:
+                pollers[spreadsheet_path] = spreadsheet_poller(spreadsheet_path, master_spreadsheet_url, session, download_cache)
+            else:
+                pollers[spreadsheet_path] = spreadsheet_poller(spreadsheet_path)
+        print(f"Watching for changes every {interval:g} seconds. Press Ctrl+C to stop.")
+        try:
+            for changed in watch_spreadsheets(pollers, selected, target_dates, cache_folder, interval):
+                # The ABU sleeves answer given earlier in the run is reused, so this doesn't ask again
+                for spreadsheet_path, meeting in changed:
+                    describe_meeting(meeting)
+                uniform_rules.resolve([meeting for _, meeting in changed])
+                changed_jobs = []
+                for spreadsheet_path, meeting in changed:
+                    if args.batch or multi_squadron:
+                        save_path = batch_save_path(base_meetings_folder, meeting, multi_squadron, squadron_names[spreadsheet_path])
+                    else:
+                        save_path = jobs[0]["save_path"]
+                    changed_jobs.append(make_render_job(spreadsheet_path, meeting, template_path, save_path, config, cache_folder))
+                results = generate_schedules(changed_jobs, config, max_workers=args.jobs, reuse_outputs=not args.rebuild)
+                if upload:
+                    upload_results(results, config, cache_folder)
+                if prometheus_file:
+                    telemetry.write_prometheus(prometheus_file)
+        except KeyboardInterrupt:
+            print("Stopped watching.")
+
+
+    # The master spreadsheet is downloaded into memory now, but delete a copy left by an older version of the script
+    if os.path.isfile(master_spreadsheet_path) and download_spreadsheet:
+        try:
+            os.remove(master_spreadsheet_path)
+        except Exception as e:
+            print(f"Could not delete {master_spreadsheet_path}: {e}. Please do not make any changes to it as the script re-downloads it every time it runs.")
+
+    if download_template:
+        try:
+            os.remove(os.path.join(script_dir, "Meeting Schedule.docx"))
+        except Exception as e:
+            ...
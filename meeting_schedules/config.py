@@ -0,0 +1,15 @@
+import json
+import os
+
+# The folder the preferences file, the master spreadsheet and the downloaded template live in
+# (the folder with automated_meeting_schedules.py in it)
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CONFIG_PATH = os.path.join(script_dir, "automated_meeting_schedules_preferences.json")
+
+
+def load_config(config_path=None):
+    """
+    Read the preferences file (automated_meeting_schedules_preferences.json next to the script by default).
+    """
+    with open(config_path or DEFAULT_CONFIG_PATH) as f:
+        return json.load(f)
@@ -0,0 +1,422 @@
+import hashlib
+import http.client
+import io
+import json
+import os
+import re
+import threading
+import time
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+from urllib3.util.retry import Retry
+
+from . import telemetry
+from .files import write_file_atomic
+from .spreadsheet import load_meeting_index
+
+# Seconds to wait for the server to connect, and for each read
+DOWNLOAD_TIMEOUT = (15, 60)
+# Reads start at MIN_CHUNK_SIZE and are made bigger or smaller so each takes about CHUNK_SECONDS
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+CHUNK_SECONDS = 0.1
+# How many times a download that dropped picks up where it stopped before giving up
+MAX_RESUMES = 5
+# What servers send instead of the file: sign-in and error pages, API errors
+NOT_A_FILE_TYPES = ("text/", "application/json", "application/xhtml+xml")
+# .xlsx and .docx files are zip packages: they start with a local file header and end with the
+# end of central directory record, followed by a comment of up to 64 KiB
+ZIP_SIGNATURE = b"PK\x03\x04"
+ZIP_END_SIGNATURE = b"PK\x05\x06"
+ZIP_END_MAX_SIZE = 22 + 0xFFFF
+
+
+class DownloadCache:
+    """
+    Keeps the last downloaded copy of each URL along with its ETag, Last-Modified and the resolved
+    SharePoint download link, so later runs can ask the server whether the file changed (and
+    reuse the cached copy on 304 Not Modified) instead of downloading it again.
+    The least recently used files are evicted when the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_folder, max_bytes=200 * 1024 * 1024):
+        self.folder = os.path.join(cache_folder, "downloads")
+        self.index_path = os.path.join(self.folder, "index.json")
+        self.max_bytes = max_bytes
+        self.entries = {}
+        # Downloads run in parallel threads and share this cache
+        self.lock = threading.RLock()
+        if os.path.isfile(self.index_path):
+            try:
+                with open(self.index_path) as f:
+                    self.entries = json.load(f)
+            except Exception:
+                self.entries = {}
+
+    def lookup(self, url):
+        """
+        Return the cache entry for url, or None if there is no usable cached copy.
+        """
+        entry = self.entries.get(url)
+        if entry and os.path.isfile(os.path.join(self.folder, entry["file"])):
+            return entry
+        return None
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def restore(self, url, target):
+        """
+        Copy the cached file for url to target, a file name or a binary buffer.
+        """
+        with self.lock:
+            entry = self.entries[url]
+            with open(os.path.join(self.folder, entry["file"]), "rb") as f:
+                data = f.read()
+            if hasattr(target, "write"):
+                target.write(data)
+            else:
+                write_file_atomic(target, data)
+            entry["last_used"] = time.time()
+            self.save()
+
+    def store(self, url, data, response, download_url):
+        """
+        Keep a copy of a freshly downloaded file (its bytes) along with the validators from its response.
+        """
+        with self.lock:
+            os.makedirs(self.folder, exist_ok=True)
+            cached_name = hashlib.sha256(url.encode()).hexdigest()
+            write_file_atomic(os.path.join(self.folder, cached_name), data)
+            self.entries[url] = {
+                "file": cached_name,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "download_url": download_url,
+                "size": len(data),
+                "last_used": time.time(),
+            }
+            self.evict()
+            self.save()
+
+    def evict(self):
+        total = sum(entry["size"] for entry in self.entries.values())
+        for url, entry in sorted(self.entries.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.folder, entry["file"]))
+            except OSError:
+                ...
+            total -= entry["size"]
+            del self.entries[url]
+
+    def save(self):
+        os.makedirs(self.folder, exist_ok=True)
+        write_file_atomic(self.index_path, json.dumps(self.entries, indent=4).encode())
+
+
+class InvalidDownloadError(requests.exceptions.RequestException):
+    """
+    The server sent something other than the file (e.g. a sign-in page), or the file is damaged.
+    Not retried, since asking again gets the same answer.
+    """
+
+
+def _content_type(response):
+    return response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+
+
+def check_file_response(response):
+    """
+    Raise InvalidDownloadError if a response is clearly not a file: an HTML page or an API error.
+    """
+    content_type = _content_type(response)
+    if content_type.startswith(NOT_A_FILE_TYPES):
+        raise InvalidDownloadError(f"The server sent a {content_type} page instead of the file. "
+                                   "Check the link and its permissions.")
+
+
+def check_file_content(data, expect_zip=True):
+    """
+    Raise InvalidDownloadError if downloaded data (bytes) isn't a whole file. With expect_zip, for
+    .xlsx and .docx files, it must start with the zip signature and end with the zip directory.
+    """
+    if not data:
+        raise InvalidDownloadError("The server sent an empty file.")
+    if not expect_zip:
+        return
+    if not data.startswith(ZIP_SIGNATURE):
+        raise InvalidDownloadError("The server sent something that isn't an Office document. "
+                                   "Check the link and its permissions.")
+    if data.rfind(ZIP_END_SIGNATURE, max(0, len(data) - ZIP_END_MAX_SIZE)) < 0:
+        raise InvalidDownloadError("The downloaded file is cut off (its zip directory is missing).")
+
+
+def _content_length(response):
+    """
+    The size of the body, or None if the server didn't say (or compressed it, so the size isn't the file's).
+    """
+    total = response.headers.get("Content-Length")
+    if total is None or response.headers.get("Content-Encoding", "identity") != "identity":
+        return None
+    return int(total)
+
+
+class ChunkedDownload:
+    """
+    Reads the body of a 200 OK response into memory. Reads start at MIN_CHUNK_SIZE and double (up
+    to MAX_CHUNK_SIZE) while they take less than half of CHUNK_SECONDS, or halve when they take
+    more than twice that, so a fast connection is read in a few big chunks and a slow one still
+    shows progress.
+    If the connection drops partway through, the rest of the file is asked for with a Range request.
+    If-Range (the ETag or Last-Modified of the first response) makes the server send the whole
+    file instead if it changed in the meantime, and the download then starts over from that.
+    """
+
+    def __init__(self, session, response, max_resumes=MAX_RESUMES):
+        self.session = session
+        self.response = response
+        self.url = response.url
+        self.validator = self._validator(response)
+        self.total = _content_length(response)
+        self.max_resumes = max_resumes
+        self.resumes = 0
+        self.received = 0
+        self.seconds = 0.0
+        self.chunk_size = MIN_CHUNK_SIZE
+        self.buffer = io.BytesIO()
+
+    @staticmethod
+    def _validator(response):
+        """
+        The If-Range value to resume this response with, or None if it can't be resumed.
+        """
+        if response.headers.get("Accept-Ranges", "").lower() == "none" or _content_length(response) is None:
+            return None
+        etag = response.headers.get("ETag")
+        if etag and not etag.startswith("W/"):  # If-Range only takes strong ETags
+            return etag
+        return response.headers.get("Last-Modified")
+
+    def read(self, bar=None):
+        """
+        Read the whole file and return its bytes, updating the tqdm progress bar if given.
+        Raises requests.exceptions.ConnectionError if the connection dropped and couldn't be resumed.
+        """
+        start = time.perf_counter()
+        try:
+            while True:
+                try:
+                    self._read_body(bar)
+                    error = None
+                except (urllib3.exceptions.HTTPError, http.client.HTTPException, OSError) as e:
+                    error = e
+                if error is None and (self.total is None or self.buffer.tell() == self.total):
+                    return self.buffer.getvalue()
+                if error is None:
+                    error = f"the connection closed after {self.buffer.tell()} of {self.total} bytes"
+                self._resume(error, bar)
+        finally:
+            self.response.close()
+            self.seconds = time.perf_counter() - start
+
+    def throughput(self):
+        """
+        Bytes received per second.
+        """
+        return self.received / self.seconds if self.seconds else 0.0
+
+    def _read_body(self, bar):
+        raw = self.response.raw
+        while True:
+            started = time.perf_counter()
+            chunk = raw.read(self.chunk_size, decode_content=True)
+            if not chunk:
+                return
+            took = time.perf_counter() - started
+            self.buffer.write(chunk)
+            self.received += len(chunk)
+            if bar is not None:
+                bar.update(len(chunk))
+            if len(chunk) == self.chunk_size and took < CHUNK_SECONDS / 2:
+                self.chunk_size = min(self.chunk_size * 2, MAX_CHUNK_SIZE)
+            elif took > CHUNK_SECONDS * 2:
+                self.chunk_size = max(self.chunk_size // 2, MIN_CHUNK_SIZE)
+
+    def _resume(self, error, bar):
+        """
+        Ask for the rest of the file after the connection dropped, or raise if that isn't possible.
+        """
+        offset = self.buffer.tell()
+        self.response.close()
+        if self.validator is None or self.resumes >= self.max_resumes:
+            raise requests.exceptions.ConnectionError(f"The download stopped after {offset} bytes ({error}).")
+        self.resumes += 1
+        response = self.session.get(self.url, headers={"Range": f"bytes={offset}-", "If-Range": self.validator},
+                                    stream=True, timeout=DOWNLOAD_TIMEOUT)
+        if response.status_code == 206 and response.headers.get("Content-Range", "").startswith(f"bytes {offset}-"):
+            self.response = response
+            return
+        if response.status_code == 200:
+            # The file changed, or the server doesn't do ranges: start over from this response
+            check_file_response(response)
+            self.response = response
+            self.validator = self._validator(response)
+            self.total = _content_length(response)
+            self.buffer = io.BytesIO()
+            if bar is not None:
+                bar.reset(total=self.total)
+            return
+        response.close()
+        raise requests.exceptions.ConnectionError(
+            f"The download stopped after {offset} bytes ({error}) and couldn't be resumed (status {response.status_code}).")
+
+
+def download_with_progress(url, filename, desc="Downloading", cache=None, refresh=False, session=None, position=0, quiet=False,
+                           expect_zip=True):
+    """
+    Download a file from a SharePoint edit/view URL using requests, with a progress bar.
+    Handles SharePoint redirect to the actual file download link.
+    filename is where to save it, or a binary buffer (e.g. BytesIO) to download into memory instead.
+    The download is read in large chunks (see ChunkedDownload) and kept in memory until it's
+    complete and checked (see check_file_content), then written in one step, so a failed or bad
+    download never leaves a half-written file or an error page behind. Nothing is written for
+    responses other than 200 OK (and 304, below); the caller checks the returned response's status code.
+    With a DownloadCache, the request is conditional and a 304 Not Modified response restores the
+    cached copy to filename instead. refresh=True ignores the cached copy and downloads the file again.
+    quiet=True hides the progress bar and the "not modified" and speed messages (used when polling).
+    expect_zip=False skips the zip checks, for files that aren't Office documents.
+    """
+    in_memory = hasattr(filename, "write")
+    with telemetry.stage("download", file=desc if in_memory else os.path.basename(filename)) as span:
+        session = session or requests.Session()
+        entry = cache.lookup(url) if cache is not None and not refresh else None
+        headers = cache.conditional_headers(entry) if entry else {}
+
+        response = None
+        download_url = None
+        if entry and entry.get("download_url"):
+            # Try the download link found last time first, it skips loading the SharePoint page.
+            # SharePoint download links expire, so fall back to the page if it no longer works.
+            response = session.get(entry["download_url"], headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT)
+            if response.status_code in (200, 304) and _content_type(response) != "text/html":
+                download_url = entry["download_url"]
+            else:
+                response.close()
+                response = None
+
+        if response is None:
+            # Try to get the file with streaming
+            response = session.get(url, headers=headers, stream=True, allow_redirects=True, timeout=DOWNLOAD_TIMEOUT)
+            download_url = response.url
+            # If SharePoint, look for a downloadUrl in the redirected page
+            if response.status_code == 200 and _content_type(response) == "text/html":
+                # Try to extract the download link from the HTML
+                match = re.search(r'"downloadUrl":"([^"]+)"', response.text)
+                if match:
+                    download_url = match.group(1).replace('\\u0026', '&')
+                    response = session.get(download_url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT)
+                else:
+                    raise InvalidDownloadError("Could not find a direct download link in the SharePoint page.")
+
+        if response.status_code == 304 and entry:
+            cache.restore(url, filename)
+            span.bytes = 0
+            if not quiet:
+                print(f"{desc}: not modified since the last run, using the cached copy.")
+            return response
+        if response.status_code != 200:
+            response.close()
+            return response
+
+        check_file_response(response)
+        download = ChunkedDownload(session, response)
+        with tqdm(
+            desc=desc,
+            total=download.total,
+            unit='B',
+            unit_scale=True,
+            unit_divisor=1024,
+            position=position,
+            disable=(download.total is None or quiet)
+        ) as bar:
+            data = download.read(bar)
+        span.bytes = download.received
+        check_file_content(data, expect_zip)
+
+        if in_memory:
+            filename.write(data)
+        else:
+            write_file_atomic(filename, data)
+        if not quiet:
+            resumed = f", resumed {download.resumes} time(s)" if download.resumes else ""
+            print(f"{desc}: {tqdm.format_sizeof(len(data), 'B', 1024)} in {download.seconds:.2f} s "
+                  f"({tqdm.format_sizeof(download.throughput(), 'B/s', 1024)}{resumed}).")
+        if cache is not None:
+            try:
+                # The validators of the response the file was finished from
+                cache.store(url, data, download.response, download_url)
+            except Exception as e:
+                print(f"Could not cache {desc if in_memory else os.path.basename(filename)}: {e}")
+        return response
+
+
+def make_download_session(pool_size=4, retries=3):
+    """
+    One requests session shared by every download, so connections to SharePoint are pooled and reused.
+    Failed connections and 429/5xx responses are retried with exponential backoff.
+    """
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(["GET", "HEAD"]))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def download_with_retries(url, filename, desc, session, cache=None, refresh=False, retries=3, position=0, quiet=False,
+                          expect_zip=True):
+    """
+    download_with_progress, started over with exponential backoff if it fails with a network error
+    it couldn't resume from (the session only retries requests that fail before the download starts).
+    InvalidDownloadError isn't retried.
+    """
+    for attempt in range(retries + 1):
+        if hasattr(filename, "write"):
+            # Start the buffer over if an earlier attempt wrote to it
+            filename.seek(0)
+            filename.truncate()
+        try:
+            return download_with_progress(url, filename, desc, cache=cache, refresh=refresh, session=session,
+                                          position=position, quiet=quiet, expect_zip=expect_zip)
+        except InvalidDownloadError:
+            raise
+        except requests.exceptions.RequestException as e:
+            if attempt == retries:
+                raise
+            delay = 2 ** attempt
+            print(f"{desc} failed ({e}). Retrying in {delay} seconds...")
+            time.sleep(delay)
+
+
+def download_and_index_spreadsheet(url, spreadsheet_path, session, cache_folder, cache=None, refresh=False, target_dates=None):
+    """
+    Download the master spreadsheet and build its meeting index, meant to run in the background.
+    The spreadsheet is downloaded into memory and read from there; it isn't saved to spreadsheet_path.
+    """
+    buffer = io.BytesIO()
+    response = download_with_retries(url, buffer, "Downloading master spreadsheet", session, cache=cache, refresh=refresh)
+    if response.status_code not in (200, 304):
+        raise RuntimeError(f"Failed to download spreadsheet. Check the link permissions. Status code: {response.status_code}")
+    print("Spreadsheet downloaded successfully!")
+    return load_meeting_index(spreadsheet_path, cache_folder, target_dates, data=buffer.getvalue())
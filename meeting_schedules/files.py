@@ -0,0 +1,33 @@
+import os
+import shutil
+
+
+def write_file_atomic(path, data):
+    """
+    Write data (bytes) to path through a temporary file in the same folder that's then renamed over
+    it, so nobody (OneDrive, a watcher, an interrupted run) ever sees a half-written file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            ...
+        raise
+
+
+def move_file_atomic(src, dst):
+    """
+    Move src to dst in one step. A rename on the same drive; otherwise copied next to dst and renamed.
+    """
+    try:
+        os.replace(src, dst)
+    except OSError:
+        tmp_path = f"{dst}.{os.getpid()}.tmp"
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+        os.remove(src)
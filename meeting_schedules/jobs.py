@@ -0,0 +1,196 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import telemetry
+from .files import write_file_atomic
+from .outputs import cached_outputs, output_key, record_outputs
+from .pdf import export_pdfs_with_soffice, pdf_backend, try_export_pdf
+from .rendering import load_render_plan
+
+
+def save_meeting_document(data, save_path, save_file_date, config, export_pdf=True, native_source=None):
+    """
+    Save a rendered schedule (the docx bytes) as docx (and PDF if enabled) in save_path.
+    The docx is written in one step, so the folder never has a half-written schedule.
+    native_source is passed on to try_export_pdf.
+    Returns the docx path and the PDF path (None if no PDF was exported).
+    """
+    modified_doc_file = f"{save_file_date} Meeting Schedule.docx"
+    docx_full_path = os.path.join(save_path, modified_doc_file)
+    with telemetry.stage("save", date=save_file_date) as span:
+        write_file_atomic(docx_full_path, data)
+        span.bytes = len(data)
+    print(f"Document saved as {modified_doc_file} in {save_path}.")
+
+    # Export as PDF (try docx2pdf, then LibreOffice, else skip)
+    pdf_full_path = None
+    if export_pdf and config.get("export_as_pdf"):
+        pdf_file_name = f"{save_file_date} Meeting Schedule.pdf"
+        with telemetry.stage("pdf_conversion", date=save_file_date) as span:
+            if try_export_pdf(docx_full_path, save_path, pdf_file_name, timeout=config.get("pdf_export_timeout", 120),
+                              native=config.get("native_pdf", True), native_source=native_source):
+                pdf_full_path = os.path.join(save_path, pdf_file_name)
+                if telemetry.is_enabled():
+                    span.bytes = os.path.getsize(pdf_full_path)
+    return docx_full_path, pdf_full_path
+
+
+def render_job(job):
+    """
+    Render, save and export one (spreadsheet, meeting) job.
+    Only takes picklable data so it can run in a worker process. Errors are returned in the
+    result instead of raised, so one bad meeting doesn't stop the rest of the run.
+    """
+    result = {
+        "spreadsheet": job["spreadsheet"],
+        "date": job["save_file_date"],
+        "docx": None,
+        "pdf": None,
+        "error": None,
+        "cached": False,
+        "telemetry": [],
+    }
+    # In a worker process the stages are collected and sent back with the result
+    if job.get("telemetry"):
+        telemetry.enable(collect=True)
+    try:
+        plan = load_render_plan(job["template_path"], job["config"]["drill_test_sign_up_phrase"].strip(), job.get("cache_folder"))
+        with telemetry.stage("docx_render", date=job["save_file_date"]):
+            document = plan.render_document(job["meeting"], job["config"])
+            data = plan.package(document)
+        export_pdf = job.get("export_pdf", True)
+        result["docx"], result["pdf"] = save_meeting_document(data, job["save_path"], job["save_file_date"], job["config"],
+                                                              export_pdf, native_source=(document, plan.pdf_layout))
+        if export_pdf and job["config"].get("export_as_pdf") and result["pdf"] is None:
+            result["error"] = "PDF export failed (the .docx was saved)"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    if job.get("telemetry"):
+        result["telemetry"] = telemetry.take_events()
+    return result
+
+
+def run_render_jobs(jobs, max_workers=1):
+    """
+    Run render jobs in order in this process, or spread them over a process pool if max_workers > 1.
+    Returns one result per job, in the order the jobs were given.
+    """
+    if max_workers <= 1 or len(jobs) <= 1:
+        return [render_job(job) for job in jobs]
+
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs))) as pool:
+        futures = {pool.submit(render_job, dict(job, telemetry=telemetry.is_enabled())): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+                telemetry.add_events(results[i]["telemetry"])
+            except Exception as e:
+                # The worker itself died (e.g. BrokenProcessPool), not just the render
+                results[i] = {
+                    "spreadsheet": jobs[i]["spreadsheet"],
+                    "date": jobs[i]["save_file_date"],
+                    "docx": None,
+                    "pdf": None,
+                    "error": f"{type(e).__name__}: {e}",
+                    "cached": False,
+                    "telemetry": [],
+                }
+    return results
+
+
+def make_render_job(spreadsheet_path, meeting, template_path, save_path, config, cache_folder=None):
+    """
+    The render job (see render_job) for one meeting, saved in save_path.
+    The compiled template is saved in cache_folder, if given, for the other workers to load.
+    """
+    return {
+        "spreadsheet": spreadsheet_path,
+        "meeting": meeting,
+        "template_path": template_path,
+        "save_path": save_path,
+        "save_file_date": meeting["date"].strftime("%m-%d-%Y"),
+        "config": config,
+        "cache_folder": cache_folder,
+    }
+
+
+def batch_save_path(base_meetings_folder, meeting, multi_squadron, squadron):
+    """
+    The meeting folder a batch run saves a meeting in, created if it's missing.
+    With several squadrons, each workbook gets its own folder inside base_meetings_folder, named
+    after its squadron (e.g. "Squadron A" or "2025/Squadron A", see catalog.squadron_name).
+    """
+    save_path = base_meetings_folder
+    if multi_squadron:
+        save_path = os.path.join(save_path, *squadron.split("/"))
+    save_path = os.path.join(save_path, meeting["date"].strftime("%m-%d-%Y"))
+    if not os.path.exists(save_path):
+        os.makedirs(save_path)
+        print(f"Created folder: {save_path}")
+    return save_path
+
+
+def generate_schedules(jobs, config, max_workers=1, reuse_outputs=True):
+    """
+    Render, save and export the jobs, then print a summary if there was more than one or something failed.
+    With reuse_outputs, jobs whose schedule was already made from the same meeting, template and
+    settings are skipped (see outputs.py).
+    Returns one result per job, like run_render_jobs.
+    """
+    keys = [output_key(job) for job in jobs]
+    results = [None] * len(jobs)
+    if reuse_outputs:
+        for i, (job, key) in enumerate(zip(jobs, keys)):
+            outputs = cached_outputs(job, key)
+            if outputs:
+                results[i] = {
+                    "spreadsheet": job["spreadsheet"],
+                    "date": job["save_file_date"],
+                    "docx": outputs[0],
+                    "pdf": outputs[1],
+                    "error": None,
+                    "cached": True,
+                    "telemetry": [],
+                }
+                print(f"{job['save_file_date']} Meeting Schedule in {job['save_path']} is up to date. Skipping.")
+    pending = [i for i, result in enumerate(results) if result is None]
+    jobs = [jobs[i] for i in pending]
+
+    # Without the LibreOffice server, one soffice call for the whole batch is much faster than one per file
+    batch_pdfs = config.get("export_as_pdf") and len(jobs) > 1 and pdf_backend(config.get("native_pdf", True)) == "soffice"
+    if batch_pdfs:
+        for job in jobs:
+            job["export_pdf"] = False
+
+    rendered = run_render_jobs(jobs, max_workers=max_workers)
+
+    if batch_pdfs:
+        docx_paths = [r["docx"] for r in rendered if r["docx"]]
+        with telemetry.stage("pdf_conversion", files=len(docx_paths)) as span:
+            pdf_paths = export_pdfs_with_soffice(docx_paths, timeout=config.get("pdf_export_timeout", 120))
+            if telemetry.is_enabled():
+                span.bytes = sum(os.path.getsize(pdf_path) for pdf_path in pdf_paths.values() if pdf_path)
+        for r in rendered:
+            if r["docx"]:
+                r["pdf"] = pdf_paths[r["docx"]]
+                if r["pdf"] is None and not r["error"]:
+                    r["error"] = "PDF export failed (the .docx was saved)"
+
+    for i, job, r in zip(pending, jobs, rendered):
+        results[i] = r
+        if r["docx"] and not r["error"]:
+            try:
+                record_outputs(job, keys[i], r["docx"], r["pdf"])
+            except OSError as e:
+                print(f"Could not update the manifest in {job['save_path']}: {e}")
+
+    failures = [r for r in results if r["error"]]
+    unchanged = len(results) - len(rendered)
+    if len(results) > 1 or failures:
+        print(f"Generated {len(results) - len(failures)} of {len(results)} schedules"
+              f"{f' ({unchanged} unchanged since the last run)' if unchanged else ''}.")
+        for r in failures:
+            print(f"  Failed: {os.path.basename(r['spreadsheet'])} {r['date']}: {r['error']}")
+    return results
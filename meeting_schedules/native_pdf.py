@@ -0,0 +1,552 @@
+"""
+Draws the PDF of a schedule straight from its document.xml with reportlab, in this process, without
+Word or LibreOffice. It knows the parts schedules are made of: the page header (the squadron
+letterhead, its text and pictures), paragraphs (the title, date, uniform and drill test sign-up
+lines and any other text in the template) and the agenda table. Footers, text boxes and pictures
+in the body aren't drawn, and text uses the PDF standard fonts (Helvetica) instead of the
+template's, so Word or LibreOffice (native_pdf: false) still give the most exact copy.
+
+The page size, margins, paragraph styles and page headers the drawing needs are read from the
+template once, into a layout kept in its RenderPlan (see compile_pdf_layout).
+"""
+import io
+import posixpath
+import re
+import zipfile
+
+from docx.oxml import parse_xml
+from docx.oxml.ns import qn
+
+# Used when the template doesn't say: Letter with 1" margins, Word's 10 pt default text
+DEFAULT_PAGE = {"width": 612.0, "height": 792.0, "top": 72.0, "bottom": 72.0, "left": 72.0, "right": 72.0}
+DEFAULT_FONT_SIZE = 10.0
+# Word puts 0.08" between a table cell's border and its text, left and right
+CELL_SIDE_MARGIN = 5.4
+# Line height as a multiple of the font size for single spacing
+LINE_HEIGHT = 1.2
+FONTS = {
+    (False, False): "Helvetica",
+    (True, False): "Helvetica-Bold",
+    (False, True): "Helvetica-Oblique",
+    (True, True): "Helvetica-BoldOblique",
+}
+TOKEN_PATTERN = re.compile(r"\S+|\s+")
+# The text elements of a run and the text they stand for (None: the element's own text)
+RUN_TEXT = {qn("w:t"): None, qn("w:tab"): "    ", qn("w:ptab"): "    ", qn("w:br"): "\n", qn("w:cr"): "\n",
+            qn("w:noBreakHyphen"): "-"}
+W_P, W_R, W_TBL, W_TR, W_TC = qn("w:p"), qn("w:r"), qn("w:tbl"), qn("w:tr"), qn("w:tc")
+W_PPR, W_RPR, W_TCPR, W_PSTYLE = qn("w:pPr"), qn("w:rPr"), qn("w:tcPr"), qn("w:pStyle")
+W_VAL, W_SZ, W_COLOR, W_JC, W_SPACING = qn("w:val"), qn("w:sz"), qn("w:color"), qn("w:jc"), qn("w:spacing")
+RUN_FLAGS = ((qn("w:b"), "bold"), (qn("w:i"), "italic"))
+WP_ANCHOR, WP_INLINE, WP_EXTENT, A_BLIP = qn("wp:anchor"), qn("wp:inline"), qn("wp:extent"), qn("a:blip")
+EMU_PER_POINT = 12700
+# Word puts the header half an inch below the top of the page unless the section says otherwise
+DEFAULT_HEADER_DISTANCE = 36.0
+RELATIONSHIPS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def is_available():
+    try:
+        import reportlab  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _twips(element, attribute, default=None):
+    """
+    A measurement attribute in twentieths of a point, as points.
+    """
+    if element is None or element.get(qn(attribute)) is None:
+        return default
+    return int(element.get(qn(attribute))) / 20
+
+
+def _on(element):
+    """
+    Whether an on/off property (w:b, w:i) is set.
+    """
+    return element is not None and element.get(W_VAL) not in ("0", "false", "off")
+
+
+def _paragraph_properties(pPr, inherited):
+    """
+    inherited, updated with the size, bold, italic, alignment and spacing set in pPr (a w:pPr or
+    a style's w:pPr and w:rPr).
+    """
+    props = dict(inherited)
+    if pPr is None:
+        return props
+    jc = pPr.find(W_JC)
+    if jc is not None:
+        props["align"] = jc.get(W_VAL)
+    spacing = pPr.find(W_SPACING)
+    if spacing is not None:
+        props["before"] = _twips(spacing, "w:before", props["before"])
+        props["after"] = _twips(spacing, "w:after", props["after"])
+        if spacing.get(qn("w:line")) and spacing.get(qn("w:lineRule"), "auto") == "auto":
+            props["line"] = int(spacing.get(qn("w:line"))) / 240
+    return props
+
+
+def _run_properties(rPr, inherited):
+    props = dict(inherited)
+    if rPr is None:
+        return props
+    sz = rPr.find(W_SZ)
+    if sz is not None:
+        props["size"] = int(sz.get(W_VAL)) / 2
+    for tag, key in RUN_FLAGS:
+        element = rPr.find(tag)
+        if element is not None:
+            props[key] = _on(element)
+    color = rPr.find(W_COLOR)
+    if color is not None and color.get(W_VAL, "auto") != "auto":
+        props["color"] = color.get(W_VAL)
+    return props
+
+
+def _relationships(docx, part_name):
+    """
+    {relationship id: part name} of the parts a part of an open docx ZipFile refers to.
+    """
+    folder, name = posixpath.split(part_name)
+    rels_name = posixpath.join(folder, "_rels", f"{name}.rels")
+    if rels_name not in docx.namelist():
+        return {}
+    relationships = {}
+    for relationship in parse_xml(docx.read(rels_name)).iter(f"{RELATIONSHIPS_NS}Relationship"):
+        if relationship.get("TargetMode") != "External":
+            relationships[relationship.get("Id")] = posixpath.normpath(posixpath.join(folder, relationship.get("Target")))
+    return relationships
+
+
+def read_headers(docx, document, document_name="word/document.xml"):
+    """
+    The page headers of the last section of document (a w:document element), read from the open
+    docx ZipFile it came from: {"default" / "first" / "even": (w:hdr element, {relationship id: picture bytes})}.
+    """
+    sectPr = document.body.find(qn("w:sectPr"))
+    if sectPr is None:
+        return {}
+    relationships = _relationships(docx, document_name)
+    headers = {}
+    for reference in sectPr.iterchildren(qn("w:headerReference")):
+        part_name = relationships.get(reference.get(qn("r:id")))
+        if part_name is None or part_name not in docx.namelist():
+            continue
+        pictures = {rId: docx.read(name) for rId, name in _relationships(docx, part_name).items() if name in docx.namelist()}
+        headers[reference.get(qn("w:type"), "default")] = (parse_xml(docx.read(part_name)), pictures)
+    return headers
+
+
+def _picture(drawing, pictures):
+    """
+    The bytes and size (in points) of the picture in a wp:anchor or wp:inline element, or None.
+    """
+    blip = next(drawing.iter(A_BLIP), None)
+    extent = drawing.find(WP_EXTENT)
+    data = pictures.get(blip.get(qn("r:embed"))) if blip is not None else None
+    if data is None or extent is None:
+        return None
+    return data, int(extent.get("cx")) / EMU_PER_POINT, int(extent.get("cy")) / EMU_PER_POINT
+
+
+def _anchor_position(position, start, length, size):
+    """
+    Where a floating picture starts along one side, from its wp:positionH or wp:positionV element:
+    an offset from start or an alignment within length.
+    """
+    if position is None:
+        return start
+    offset = position.find(qn("wp:posOffset"))
+    if offset is not None:
+        return start + int(offset.text) / EMU_PER_POINT
+    align = position.find(qn("wp:align"))
+    align = align.text if align is not None else None
+    if align == "center":
+        return start + (length - size) / 2
+    if align in ("right", "bottom", "outside"):
+        return start + length - size
+    return start
+
+
+def _compile_header(hdr, pictures, layout):
+    """
+    A page header laid out once: its paragraphs with their offset below the header's top, its
+    pictures with their place on the page ((bytes, x, top, width, height), top measured down from
+    the top of the page) and its height. Floating pictures are placed from their anchor, pictures
+    in the text go on a line of their own at the start of their paragraph. Tables aren't drawn.
+    """
+    page = layout["page"]
+    width = page["width"] - page["left"] - page["right"]
+    header_top = page["header"]
+    paragraphs = []
+    placed = []
+    y = 0.0
+    for p in hdr.iterchildren(W_P):
+        for anchor in p.iter(WP_ANCHOR):
+            picture = _picture(anchor, pictures)
+            if picture is None:
+                continue
+            data, picture_width, picture_height = picture
+            position_h = anchor.find(qn("wp:positionH"))
+            position_v = anchor.find(qn("wp:positionV"))
+            if position_h is not None and position_h.get("relativeFrom") == "page":
+                x = _anchor_position(position_h, 0.0, page["width"], picture_width)
+            else:
+                x = _anchor_position(position_h, page["left"], width, picture_width)
+            relative_v = position_v.get("relativeFrom") if position_v is not None else None
+            if relative_v == "page":
+                top = _anchor_position(position_v, 0.0, page["height"], picture_height)
+            elif relative_v in ("margin", "topMargin"):
+                top = _anchor_position(position_v, page["top"], page["height"] - page["top"] - page["bottom"], picture_height)
+            else:
+                top = _anchor_position(position_v, header_top + y, 0.0, picture_height)
+            placed.append((data, x, top, picture_width, picture_height))
+
+        paragraph = _layout_paragraph(p, layout, width)
+        inline = [picture for picture in map(lambda drawing: _picture(drawing, pictures), p.iter(WP_INLINE)) if picture]
+        if inline:
+            row_width = sum(picture[1] for picture in inline)
+            row_height = max(picture[2] for picture in inline)
+            align = paragraph[0]["align"]
+            if align in ("center", "centre"):
+                x = page["left"] + (width - row_width) / 2
+            elif align in ("right", "end"):
+                x = page["left"] + width - row_width
+            else:
+                x = page["left"]
+            for data, picture_width, picture_height in inline:
+                placed.append((data, x, header_top + y + paragraph[0]["before"] + row_height - picture_height,
+                               picture_width, picture_height))
+                x += picture_width
+            y += row_height
+        paragraphs.append((y, paragraph))
+        y += paragraph[2]
+    return {"paragraphs": paragraphs, "pictures": placed, "height": y}
+
+
+def compile_pdf_layout(document, styles=None, headers=None):
+    """
+    What drawing a document needs from its template, as plain data: the page size and margins (from
+    the last section of document, a w:document element), the text properties of every paragraph
+    style in styles (the w:styles element of word/styles.xml), with what they inherit already
+    applied, and the page headers (see read_headers), laid out.
+    """
+    page = dict(DEFAULT_PAGE, header=DEFAULT_HEADER_DISTANCE)
+    title_page = False
+    sectPr = document.body.find(qn("w:sectPr"))
+    if sectPr is not None:
+        pgSz = sectPr.find(qn("w:pgSz"))
+        pgMar = sectPr.find(qn("w:pgMar"))
+        page["width"] = _twips(pgSz, "w:w", page["width"])
+        page["height"] = _twips(pgSz, "w:h", page["height"])
+        for side in ("top", "bottom", "left", "right", "header"):
+            page[side] = abs(_twips(pgMar, f"w:{side}", page[side]))
+        title_page = _on(sectPr.find(qn("w:titlePg")))
+
+    defaults = {"size": DEFAULT_FONT_SIZE, "bold": False, "italic": False, "color": None,
+                "align": "left", "before": 0.0, "after": 0.0, "line": 1.0}
+    paragraph_styles = {}
+    default_style = None
+    if styles is not None:
+        doc_defaults = styles.find(qn("w:docDefaults"))
+        if doc_defaults is not None:
+            defaults = _run_properties(doc_defaults.find(f"{qn('w:rPrDefault')}/{qn('w:rPr')}"), defaults)
+            defaults = _paragraph_properties(doc_defaults.find(f"{qn('w:pPrDefault')}/{qn('w:pPr')}"), defaults)
+
+        elements = {}
+        for style in styles.findall(qn("w:style")):
+            if style.get(qn("w:type")) == "paragraph":
+                elements[style.get(qn("w:styleId"))] = style
+                if style.get(qn("w:default")) in ("1", "true", "on"):
+                    default_style = style.get(qn("w:styleId"))
+
+        def resolve(style_id, seen=()):
+            if style_id in paragraph_styles:
+                return paragraph_styles[style_id]
+            style = elements[style_id]
+            based_on = style.find(qn("w:basedOn"))
+            parent_id = based_on.get(qn("w:val")) if based_on is not None else None
+            if parent_id in elements and parent_id not in seen:
+                props = resolve(parent_id, seen + (style_id,))
+            else:
+                props = defaults
+            props = _paragraph_properties(style.find(qn("w:pPr")), props)
+            paragraph_styles[style_id] = _run_properties(style.find(qn("w:rPr")), props)
+            return paragraph_styles[style_id]
+
+        for style_id in elements:
+            resolve(style_id)
+
+    layout = {"page": page, "defaults": defaults, "styles": paragraph_styles, "default_style": default_style,
+              "title_page": title_page, "headers": {}}
+    for kind, (hdr, pictures) in (headers or {}).items():
+        layout["headers"][kind] = _compile_header(hdr, pictures, layout)
+    return layout
+
+
+class _Canvas:
+    """
+    A reportlab canvas that knows where the next block goes and starts a new page (with its page
+    header) when a block doesn't fit. Text goes into one text object per page, and the font and
+    color are only set when they change, which keeps the PDF (and the time to make it) small.
+    """
+
+    def __init__(self, buffer, layout):
+        from reportlab.pdfgen.canvas import Canvas
+
+        self.layout = layout
+        self.page = layout["page"]
+        # invariant: the same document always gives the same bytes, so unchanged PDFs stay unchanged
+        self.canvas = Canvas(buffer, pagesize=(self.page["width"], self.page["height"]), invariant=True)
+        self.page_number = 0
+        self._start_page()
+
+    def _new_text(self):
+        self.text = self.canvas.beginText()
+        self.font = None
+        self.color = None
+
+    def _start_page(self):
+        """
+        Draw the page header of the new page and move below it (and the top margin).
+        """
+        self.page_number += 1
+        self._new_text()
+        self.canvas.setLineWidth(0.5)
+        page = self.page
+        self.top = page["height"] - page["top"]
+        first = self.page_number == 1 and self.layout.get("title_page")
+        header = self.layout.get("headers", {}).get("first" if first else "default")
+        if header:
+            width = page["width"] - page["left"] - page["right"]
+            header_top = page["height"] - page["header"]
+            for data, x, top, picture_width, picture_height in header["pictures"]:
+                self.canvas.drawImage(_image(data), x, page["height"] - top - picture_height,
+                                      picture_width, picture_height, mask="auto")
+            for offset, paragraph in header["paragraphs"]:
+                _draw_paragraph(self, paragraph, page["left"], header_top - offset, width)
+            # A header taller than the top margin pushes the text down, like in Word
+            self.top = min(self.top, header_top - header["height"])
+        self.y = self.top
+
+    def reserve(self, height):
+        """
+        Make room for a block of height points, on a new page if it doesn't fit on this one
+        (unless the page is still empty). Returns the top of the block.
+        """
+        if self.y - height < self.page["bottom"] and self.y < self.top:
+            self.end_page()
+            self._start_page()
+        return self.y
+
+    def draw_string(self, x, baseline, text, props):
+        font = (FONTS[props["bold"], props["italic"]], props["size"])
+        if font != self.font:
+            self.text.setFont(*font)
+            self.font = font
+        if props["color"] != self.color:
+            self.text.setFillColor(_color(props["color"]))
+            self.color = props["color"]
+        self.text.setTextOrigin(x, baseline)
+        self.text.textOut(text)
+
+    def end_page(self):
+        # Text goes on top of the cell shading and borders drawn on the page
+        self.canvas.drawText(self.text)
+        self.canvas.showPage()
+
+
+# Colors, text widths and pictures already worked out by this process
+_colors = {}
+_text_widths = {}
+_images = {}
+
+
+def _image(data):
+    """
+    A reportlab ImageReader of picture bytes, decoded once per process.
+    """
+    if data not in _images:
+        from reportlab.lib.utils import ImageReader
+
+        _images[data] = ImageReader(io.BytesIO(data))
+    return _images[data]
+
+
+def _color(value):
+    if value not in _colors:
+        from reportlab.lib.colors import HexColor, black
+
+        try:
+            _colors[value] = HexColor(f"#{value}") if value and value != "auto" else black
+        except ValueError:
+            _colors[value] = black
+    return _colors[value]
+
+
+def _text_width(text, props):
+    key = (text, props["bold"], props["italic"], props["size"])
+    if key not in _text_widths:
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+
+        _text_widths[key] = stringWidth(text, FONTS[props["bold"], props["italic"]], props["size"])
+    return _text_widths[key]
+
+
+def _run_text(r):
+    """
+    The text of a w:r element, with tabs as spaces and line breaks as "\n".
+    """
+    parts = []
+    for child in r:
+        if child.tag in RUN_TEXT:
+            parts.append(RUN_TEXT[child.tag] or child.text or "")
+    return "".join(parts)
+
+
+def _paragraph_lines(p, props, width):
+    """
+    Wrap a w:p element into lines that fit in width points. Each line is ([[text, run props, width], ...],
+    width), with neighbouring words of the same run joined into one piece of text.
+    """
+    lines = []
+    line = []
+    line_width = 0.0
+    for r in p.iterchildren(W_R):
+        run_props = _run_properties(r.find(W_RPR), props)
+        for i, part in enumerate(_run_text(r).split("\n")):
+            if i:
+                lines.append((line, line_width))
+                line, line_width = [], 0.0
+            for token in TOKEN_PATTERN.findall(part):
+                token_width = _text_width(token, run_props)
+                if line and line_width + token_width > width and not token.isspace():
+                    lines.append((line, line_width))
+                    line, line_width = [], 0.0
+                if token.isspace() and not line:
+                    continue
+                if line and line[-1][1] is run_props:
+                    line[-1][0] += token
+                    line[-1][2] += token_width
+                else:
+                    line.append([token, run_props, token_width])
+                line_width += token_width
+    lines.append((line, line_width))
+    return lines
+
+
+def _line_height(line, props):
+    size = max((run_props["size"] for _, run_props, _ in line), default=props["size"])
+    return size * LINE_HEIGHT * props["line"], size
+
+
+def _layout_paragraph(p, layout, width, in_table=False):
+    """
+    The properties and wrapped lines of a w:p element, and the height it takes up (spacing included).
+    """
+    pPr = p.find(W_PPR)
+    pStyle = pPr.find(W_PSTYLE) if pPr is not None else None
+    style_id = pStyle.get(W_VAL) if pStyle is not None else None
+    props = layout["styles"].get(style_id) or layout["styles"].get(layout["default_style"]) or layout["defaults"]
+    props = _paragraph_properties(pPr, props)
+    if in_table:
+        # Table Grid has no spacing between paragraphs
+        props.update(before=0.0, after=0.0, line=1.0)
+    lines = _paragraph_lines(p, props, width)
+    height = props["before"] + props["after"] + sum(_line_height(line, props)[0] for line, _ in lines)
+    return props, lines, height
+
+
+def _draw_paragraph(pdf, paragraph, left, top, width):
+    """
+    Draw a laid out paragraph with its top at top. Returns the bottom of the paragraph.
+    """
+    props, lines, _ = paragraph
+    y = top - props["before"]
+    for line, line_width in lines:
+        line_height, size = _line_height(line, props)
+        if props["align"] in ("center", "centre"):
+            x = left + (width - line_width) / 2
+        elif props["align"] in ("right", "end"):
+            x = left + width - line_width
+        else:
+            x = left
+        baseline = y - size
+        for text, run_props, text_width in line:
+            pdf.draw_string(x, baseline, text, run_props)
+            x += text_width
+        y -= line_height
+    return y - props["after"]
+
+
+def _draw_table(pdf, tbl, layout):
+    """
+    Draw a w:tbl element row by row with single black borders (the Table Grid style), moving a
+    row that doesn't fit to the next page.
+    """
+    widths = [_twips(grid_col, "w:w", 0) for grid_col in tbl.find(qn("w:tblGrid"))]
+    left = pdf.page["left"]
+    for tr in tbl.iterchildren(W_TR):
+        cells = []
+        x = left
+        for tc, width in zip(tr.iterchildren(W_TC), widths):
+            tcPr = tc.find(W_TCPR)
+            tcMar = tcPr.find(qn("w:tcMar")) if tcPr is not None else None
+            top_margin = _twips(tcMar.find(qn("w:top")) if tcMar is not None else None, "w:w", 0.0)
+            bottom_margin = _twips(tcMar.find(qn("w:bottom")) if tcMar is not None else None, "w:w", 0.0)
+            shd = tcPr.find(qn("w:shd")) if tcPr is not None else None
+            fill = shd.get(qn("w:fill")) if shd is not None else None
+            text_width = width - 2 * CELL_SIDE_MARGIN
+            paragraphs = [_layout_paragraph(p, layout, text_width, in_table=True) for p in tc.iterchildren(W_P)]
+            height = top_margin + bottom_margin + sum(paragraph[2] for paragraph in paragraphs)
+            cells.append((x, width, fill, top_margin, paragraphs, height))
+            x += width
+        row_height = max((cell[5] for cell in cells), default=0.0)
+
+        top = pdf.reserve(row_height)
+        canvas = pdf.canvas
+        for x, width, fill, top_margin, paragraphs, _ in cells:
+            if fill and fill != "auto":
+                canvas.setFillColor(_color(fill))
+                canvas.rect(x, top - row_height, width, row_height, stroke=1, fill=1)
+            else:
+                canvas.rect(x, top - row_height, width, row_height, stroke=1, fill=0)
+            y = top - top_margin
+            for paragraph in paragraphs:
+                y = _draw_paragraph(pdf, paragraph, x + CELL_SIDE_MARGIN, y, width - 2 * CELL_SIDE_MARGIN)
+        pdf.y = top - row_height
+
+
+def render_pdf(document, layout):
+    """
+    The PDF (bytes) of a document: document is the w:document element of a rendered schedule and
+    layout what compile_pdf_layout read from its template.
+    """
+    buffer = io.BytesIO()
+    pdf = _Canvas(buffer, layout)
+    page = layout["page"]
+    width = page["width"] - page["left"] - page["right"]
+    for block in document.body.iterchildren():
+        if block.tag == W_P:
+            paragraph = _layout_paragraph(block, layout, width)
+            top = pdf.reserve(paragraph[2])
+            pdf.y = _draw_paragraph(pdf, paragraph, page["left"], top, width)
+        elif block.tag == W_TBL:
+            _draw_table(pdf, block, layout)
+    pdf.end_page()
+    pdf.canvas.save()
+    return buffer.getvalue()
+
+
+def render_docx_pdf(docx_path):
+    """
+    The PDF (bytes) of a saved schedule, for when its RenderPlan isn't at hand.
+    """
+    with zipfile.ZipFile(docx_path) as docx:
+        document = parse_xml(docx.read("word/document.xml"))
+        styles = parse_xml(docx.read("word/styles.xml")) if "word/styles.xml" in docx.namelist() else None
+        headers = read_headers(docx, document)
+    return render_pdf(document, compile_pdf_layout(document, styles, headers))
@@ -0,0 +1,109 @@
+"""
+Remembers which schedules were already made, so a run whose meeting, template and settings haven't
+changed since the last one skips the render and the PDF export.
+
+Each meeting folder has a manifest listing the schedules saved in it, the key they were made from
+(a hash of the meeting block, the resolved uniform, the template file and the settings that
+change the output), and the size and modification time of the files, so a schedule that was
+edited or deleted afterwards is made again.
+"""
+import hashlib
+import json
+import os
+
+from .files import write_file_atomic
+from .spreadsheet import meeting_hash
+
+MANIFEST_NAME = ".meeting_schedules_manifest.json"
+# Bump this when a change to the rendering code changes the documents it makes
+RENDER_VERSION = 3
+# Preferences that change the saved files
+OUTPUT_CONFIG_KEYS = (
+    "add_drill_test_signup_text_to_abu_uniform_meetings",
+    "drill_test_sign_up_phrase",
+    "export_as_pdf",
+    "native_pdf",
+)
+
+# Template hashes already computed by this process, keyed by path
+_template_hashes = {}
+
+
+def template_hash(template_path):
+    stat = os.stat(template_path)
+    cached = _template_hashes.get(template_path)
+    if cached is None or cached[0] != (stat.st_size, stat.st_mtime_ns):
+        with open(template_path, "rb") as f:
+            cached = ((stat.st_size, stat.st_mtime_ns), hashlib.sha256(f.read()).hexdigest())
+        _template_hashes[template_path] = cached
+    return cached[1]
+
+
+def output_key(job):
+    """
+    The key a job's schedule is cached under. It changes whenever the output could.
+    """
+    config = job["config"]
+    payload = json.dumps([
+        RENDER_VERSION,
+        meeting_hash(job["meeting"]),
+        job["meeting"]["dropdown_choice"],
+        template_hash(job["template_path"]),
+        {key: config.get(key) for key in OUTPUT_CONFIG_KEYS},
+    ], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _file_stamp(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _read_manifest(folder):
+    try:
+        with open(os.path.join(folder, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def cached_outputs(job, key):
+    """
+    The (docx path, PDF path) of the schedule already saved for this job, if it was made from the
+    same key and hasn't been touched since. Returns None if it has to be made again.
+    """
+    entry = _read_manifest(job["save_path"]).get(f"{job['save_file_date']} Meeting Schedule.docx")
+    if not entry or entry.get("key") != key:
+        return None
+    paths = []
+    for name, stamp in ((entry["docx"], entry["docx_stamp"]), (entry.get("pdf"), entry.get("pdf_stamp"))):
+        if name is None:
+            paths.append(None)
+            continue
+        path = os.path.join(job["save_path"], name)
+        try:
+            if _file_stamp(path) != stamp:
+                return None
+        except OSError:
+            return None
+        paths.append(path)
+    return tuple(paths)
+
+
+def record_outputs(job, key, docx_path, pdf_path):
+    """
+    Add a freshly made schedule to its folder's manifest.
+    """
+    folder = job["save_path"]
+    manifest = _read_manifest(folder)
+    manifest[os.path.basename(docx_path)] = {
+        "key": key,
+        "meeting": job["meeting"]["date"].strftime("%m-%d-%Y"),
+        "spreadsheet": os.path.basename(job["spreadsheet"]),
+        "docx": os.path.basename(docx_path),
+        "docx_stamp": _file_stamp(docx_path),
+        "pdf": os.path.basename(pdf_path) if pdf_path else None,
+        "pdf_stamp": _file_stamp(pdf_path) if pdf_path else None,
+    }
+    # Written to a temporary file first so an interrupted run can't leave half a manifest
+    write_file_atomic(os.path.join(folder, MANIFEST_NAME), json.dumps(manifest, indent=4).encode())
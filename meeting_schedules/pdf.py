@@ -0,0 +1,330 @@
+import multiprocessing
+import multiprocessing.util
+import os
+import pathlib
+import platform
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from . import native_pdf
+from .files import move_file_atomic, write_file_atomic
+
+try:
+    # LibreOffice's Python bindings (only available in a Python that LibreOffice ships or is linked with)
+    import uno
+    from com.sun.star.beans import PropertyValue
+except ImportError:
+    uno = None
+
+
+def libreoffice_profile_args():
+    """
+    LibreOffice refuses to run twice on the same user profile, so each worker process gets its own.
+    """
+    if multiprocessing.parent_process() is None:
+        return []
+    profile_dir = os.path.join(tempfile.gettempdir(), f"automated_meeting_schedules_lo_{os.getpid()}")
+    return [f"-env:UserInstallation={pathlib.Path(profile_dir).as_uri()}"]
+
+
+def _uno_property(name, value):
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+class LibreOfficeServer:
+    """
+    One long-lived headless LibreOffice that converts documents over a local UNO pipe.
+    Starting LibreOffice takes several seconds, so it's started once and conversion jobs are queued
+    to it one at a time. If it crashes or a job runs past the timeout, it's restarted for the next job.
+    """
+
+    def __init__(self, soffice_path, timeout=120, startup_timeout=30):
+        self.soffice_path = soffice_path
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        # A forked process gets a copy of this object but not its worker thread, see get_libreoffice_server
+        self.pid = os.getpid()
+        self.pipe_name = f"automated_meeting_schedules_{self.pid}"
+        self.process = None
+        self.desktop = None
+        self.jobs = queue.Queue()
+        self.worker = threading.Thread(target=self._run_jobs, daemon=True)
+        self.worker.start()
+
+    def start(self):
+        profile_dir = os.path.join(tempfile.gettempdir(), f"automated_meeting_schedules_lo_server_{os.getpid()}")
+        self.process = subprocess.Popen([
+            self.soffice_path,
+            '--headless',
+            '--invisible',
+            '--nologo',
+            '--norestore',
+            '--nodefault',
+            f"-env:UserInstallation={pathlib.Path(profile_dir).as_uri()}",
+            f"--accept=pipe,name={self.pipe_name};urp;StarOffice.ComponentContext",
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local_context)
+        deadline = time.monotonic() + self.startup_timeout
+        while True:
+            try:
+                context = resolver.resolve(f"uno:pipe,name={self.pipe_name};urp;StarOffice.ComponentContext")
+                break
+            except Exception:
+                # Not listening yet
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError("LibreOffice did not start listening for conversions.")
+                time.sleep(0.2)
+        self.desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+
+    def stop(self):
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                ...
+            self.desktop = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def submit(self, docx_path, pdf_path):
+        """
+        Queue a conversion. Returns a Future that resolves to pdf_path.
+        """
+        future = Future()
+        self.jobs.put((docx_path, pdf_path, future))
+        return future
+
+    def convert(self, docx_path, pdf_path):
+        # Starting LibreOffice and converting each have their own timeout, so a job still waiting
+        # after both will never finish (e.g. the worker thread is gone)
+        wait = self.startup_timeout + self.timeout
+        try:
+            return self.submit(docx_path, pdf_path).result(timeout=wait)
+        except FutureTimeoutError:
+            raise TimeoutError(f"The LibreOffice server did not convert {os.path.basename(docx_path)} within {wait} seconds.") from None
+
+    def _run_jobs(self):
+        while True:
+            docx_path, pdf_path, future = self.jobs.get()
+            try:
+                if not self.is_running():
+                    # First job, or LibreOffice crashed since the last one
+                    self.desktop = None
+                    self.stop()
+                    self.start()
+                self._convert_with_timeout(docx_path, pdf_path)
+                future.set_result(pdf_path)
+            except Exception as e:
+                future.set_exception(e)
+
+    def _convert_with_timeout(self, docx_path, pdf_path):
+        outcome = {}
+
+        def run():
+            try:
+                self._convert(docx_path, pdf_path)
+            except Exception as e:
+                outcome["error"] = e
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(self.timeout)
+        if thread.is_alive():
+            # Killing LibreOffice unblocks the stuck call. The next job starts a new instance.
+            self.desktop = None
+            self.process.kill()
+            self.stop()
+            raise TimeoutError(f"LibreOffice took longer than {self.timeout} seconds to convert {os.path.basename(docx_path)}.")
+        if "error" in outcome:
+            raise outcome["error"]
+
+    def _convert(self, docx_path, pdf_path):
+        document = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(os.path.abspath(docx_path)), "_blank", 0, (_uno_property("Hidden", True),))
+        try:
+            document.storeToURL(uno.systemPathToFileUrl(os.path.abspath(pdf_path)),
+                                (_uno_property("FilterName", "writer_pdf_Export"),))
+        finally:
+            document.close(True)
+
+
+# The LibreOffice server for this process. None until first needed, False if it can't be used.
+_libreoffice_server = None
+
+
+def get_libreoffice_server(timeout=120):
+    """
+    Return this process's LibreOffice server, starting it on first use.
+    Returns None if the UNO bindings or soffice aren't available.
+    """
+    global _libreoffice_server
+    if _libreoffice_server and _libreoffice_server.pid != os.getpid():
+        # Copied from the parent into a forked worker: its thread didn't come along and its
+        # LibreOffice belongs to the parent, so this process starts its own
+        _libreoffice_server = None
+    if _libreoffice_server is None:
+        soffice_path = shutil.which("soffice")
+        if uno is None or not soffice_path:
+            _libreoffice_server = False
+        else:
+            _libreoffice_server = LibreOfficeServer(soffice_path, timeout=timeout)
+            # Process pool workers leave through os._exit, which skips atexit but still runs
+            # multiprocessing's finalizers (and so does the main process when it exits)
+            multiprocessing.util.Finalize(None, _libreoffice_server.stop, exitpriority=10)
+    return _libreoffice_server or None
+
+
+def pdf_backend(native=True):
+    """
+    The converter try_export_pdf will try first: "native", "docx2pdf", "libreoffice_server", "soffice" or None.
+    """
+    if native and native_pdf.is_available():
+        return "native"
+    if platform.system() == "Windows":
+        return "docx2pdf"
+    if uno is not None and shutil.which("soffice"):
+        return "libreoffice_server"
+    if shutil.which("soffice"):
+        return "soffice"
+    return None
+
+
+def try_export_pdf(docx_path, save_path, pdf_file_name, timeout=120, native=True, native_source=None):
+    """
+    Convert docx_path to save_path/pdf_file_name with the fastest converter that works: the native
+    renderer (if native and reportlab is installed), then Word, then LibreOffice.
+    native_source is the schedule's (document, layout) if the caller has them (see RenderPlan), so
+    the native renderer doesn't have to read docx_path again.
+    Every converter writes to a temporary name first, so the PDF only appears once it's complete.
+    """
+    pdf_path = os.path.join(save_path, pdf_file_name)
+    # Ends in .pdf, since Word and LibreOffice pick the format from the name
+    tmp_pdf_path = os.path.join(save_path, f".{os.getpid()}.{pdf_file_name}")
+    try:
+        # Drawn in this process, no office suite to start
+        if native and native_pdf.is_available():
+            try:
+                if native_source:
+                    data = native_pdf.render_pdf(*native_source)
+                else:
+                    data = native_pdf.render_docx_pdf(docx_path)
+                write_file_atomic(pdf_path, data)
+                print(f"PDF exported as {pdf_file_name} to {pdf_path} using the native renderer.")
+                return True
+            except Exception as e:
+                print(f"Native PDF export failed: {e}. Trying Word or LibreOffice instead.")
+
+        docx2pdf_error = None
+
+        # Only try docx2pdf on Windows
+        if platform.system() == "Windows":
+            try:
+                from docx2pdf import convert
+                convert(docx_path, tmp_pdf_path)
+                os.replace(tmp_pdf_path, pdf_path)
+                print(f"PDF exported as {pdf_file_name} to {pdf_path} using docx2pdf.")
+                return True
+            except Exception as e:
+                docx2pdf_error = e  # Store the error, don't print yet
+
+        # Try the LibreOffice server first, it skips LibreOffice's start-up time on every file
+        server = get_libreoffice_server(timeout)
+        if server:
+            try:
+                server.convert(docx_path, tmp_pdf_path)
+                os.replace(tmp_pdf_path, pdf_path)
+                print(f"PDF exported as {pdf_file_name} to {pdf_path} using the LibreOffice server.")
+                return True
+            except Exception as e:
+                print(f"LibreOffice server PDF export failed: {e}. Trying soffice instead.")
+
+        # Try LibreOffice (works on Linux, Windows, Mac if installed)
+        soffice_path = shutil.which("soffice")
+        if soffice_path:
+            try:
+                # soffice names the PDF after the docx, so it's converted in a scratch folder and moved in place
+                with tempfile.TemporaryDirectory() as outdir:
+                    subprocess.run([soffice_path, '--headless'] + libreoffice_profile_args() + [
+                        '--convert-to', 'pdf',
+                        '--outdir', outdir,
+                        docx_path
+                    ], check=True, timeout=timeout)
+                    move_file_atomic(os.path.join(outdir, os.path.splitext(os.path.basename(docx_path))[0] + ".pdf"), pdf_path)
+                print(f"PDF exported as {pdf_file_name} to {pdf_path} using LibreOffice.")
+                return True
+            except Exception as e:
+                print("PDF export failed. Please ensure LibreOffice is installed.")
+                if docx2pdf_error:
+                    print(f"docx2pdf failed: {docx2pdf_error}")
+                print(f"LibreOffice PDF export failed: {e}")
+        else:
+            if docx2pdf_error:
+                print(f"docx2pdf failed: {docx2pdf_error}")
+
+        print("PDF export failed. Please ensure LibreOffice is installed.")
+        return False
+    finally:
+        # Left behind by a converter that failed partway
+        if os.path.exists(tmp_pdf_path):
+            os.remove(tmp_pdf_path)
+
+
+def export_pdfs_with_soffice(docx_paths, timeout=120):
+    """
+    Convert many documents with as few soffice calls as possible, for when the LibreOffice server
+    isn't available. Each PDF is written next to its docx. Returns {docx_path: pdf_path or None}.
+    """
+    soffice_path = shutil.which("soffice")
+    results = {docx_path: None for docx_path in docx_paths}
+    if not soffice_path:
+        print("PDF export failed. Please ensure LibreOffice is installed.")
+        return results
+
+    # soffice writes every PDF into one folder, so files with the same name need separate calls
+    rounds = []
+    for docx_path in docx_paths:
+        name = os.path.basename(docx_path)
+        for names in rounds:
+            if name not in names:
+                names[name] = docx_path
+                break
+        else:
+            rounds.append({name: docx_path})
+
+    for names in rounds:
+        with tempfile.TemporaryDirectory() as outdir:
+            try:
+                subprocess.run([soffice_path, '--headless'] + libreoffice_profile_args() + [
+                    '--convert-to', 'pdf',
+                    '--outdir', outdir,
+                ] + list(names.values()), check=True, timeout=timeout * len(names))
+            except Exception as e:
+                print(f"LibreOffice PDF export failed: {e}")
+            for name, docx_path in names.items():
+                converted = os.path.join(outdir, os.path.splitext(name)[0] + ".pdf")
+                if os.path.isfile(converted):
+                    pdf_path = os.path.splitext(docx_path)[0] + ".pdf"
+                    move_file_atomic(converted, pdf_path)
+                    results[docx_path] = pdf_path
+    print(f"Exported {sum(1 for pdf_path in results.values() if pdf_path)} of {len(results)} PDFs using LibreOffice.")
+    return results
@@ -0,0 +1,322 @@
+import copy
+import hashlib
+import io
+import json
+import os
+import pickle
+import re
+import zipfile
+
+from docx import Document
+from docx.opc.oxml import serialize_part_xml
+from docx.oxml import OxmlElement, parse_xml
+from docx.oxml.ns import nsdecls, qn
+
+from .native_pdf import compile_pdf_layout, read_headers
+from .spreadsheet import DETAIL_COLUMNS
+
+
+# --- Agenda table ---
+# The agenda table is built straight from these XML fragments, parsed once, instead of one
+# python-docx call per cell, paragraph and property.
+AGENDA_HEADERS = ['Agenda', 'Instruction Summary', 'Time', 'Instructor']
+# Fixed column widths in twentieths of a point: "Instruction Summary" is 2.31" and "Time" is 1.1".
+# The other two columns get an even share of the page, like python-docx's add_table gives every column.
+AGENDA_FIXED_WIDTHS = {1: 3326, 2: 1584}
+
+_AGENDA_TABLE_TEMPLATE = parse_xml(
+    f'<w:tbl {nsdecls("w")}>'
+    '<w:tblPr><w:tblStyle w:val="TableGrid"/><w:tblW w:type="auto" w:w="0"/>'
+    '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" w:noHBand="0" w:noVBand="1" w:val="04A0"/>'
+    '</w:tblPr>'
+    '<w:tblGrid><w:gridCol/><w:gridCol/><w:gridCol/><w:gridCol/></w:tblGrid>'
+    '</w:tbl>'
+)
+# Header cell: shaded, bold, size 16
+_AGENDA_HEADER_CELL_TEMPLATE = parse_xml(
+    f'<w:tc {nsdecls("w")}>'
+    '<w:tcPr><w:tcW w:type="dxa"/><w:shd w:fill="D7D7D7"/></w:tcPr>'
+    '<w:p><w:pPr><w:jc w:val="center"/></w:pPr><w:r><w:rPr><w:b/><w:sz w:val="32"/></w:rPr></w:r></w:p>'
+    '</w:tc>'
+)
+# Agenda cell: size 13 with 0.5pt top and bottom margins
+_AGENDA_CELL_TEMPLATE = parse_xml(
+    f'<w:tc {nsdecls("w")}>'
+    '<w:tcPr><w:tcW w:type="dxa"/><w:tcMar><w:top w:w="50" w:type="dxa"/><w:bottom w:w="50" w:type="dxa"/></w:tcMar></w:tcPr>'
+    '<w:p><w:pPr><w:jc w:val="center"/></w:pPr><w:r><w:rPr><w:sz w:val="26"/></w:rPr></w:r></w:p>'
+    '</w:tc>'
+)
+
+
+def _set_run_text(run, text):
+    """
+    Add text to a w:r element, turning tabs and line breaks into w:tab and w:br the way python-docx does.
+    """
+    for i, line in enumerate(text.split("\n")):
+        if i:
+            run.append(OxmlElement('w:br'))
+        for j, chunk in enumerate(line.split("\t")):
+            if j:
+                run.append(OxmlElement('w:tab'))
+            if chunk or (i == 0 and j == 0):
+                t = OxmlElement('w:t')
+                t.text = chunk
+                if chunk != chunk.strip():
+                    t.set(qn('xml:space'), 'preserve')
+                run.append(t)
+
+
+def _agenda_row(cell_template, texts, widths):
+    tr = OxmlElement('w:tr')
+    for text, width in zip(texts, widths):
+        tc = copy.deepcopy(cell_template)
+        tc.find(qn('w:tcPr')).find(qn('w:tcW')).set(qn('w:w'), str(width))
+        _set_run_text(tc.find(qn('w:p')).find(qn('w:r')), text)
+        tr.append(tc)
+    return tr
+
+
+def build_agenda_table(details, table_style_id, block_width):
+    """
+    Build the whole agenda table (header row plus one row per agenda item) as a single w:tbl element.
+    block_width is the width between the page margins, in twentieths of a point.
+    """
+    default_width = block_width // len(AGENDA_HEADERS)
+    widths = [AGENDA_FIXED_WIDTHS.get(i, default_width) for i in range(len(AGENDA_HEADERS))]
+
+    tbl = copy.deepcopy(_AGENDA_TABLE_TEMPLATE)
+    tbl.find(qn('w:tblPr')).find(qn('w:tblStyle')).set(qn('w:val'), table_style_id)
+    for grid_col, width in zip(tbl.find(qn('w:tblGrid')), widths):
+        grid_col.set(qn('w:w'), str(width))
+
+    tbl.append(_agenda_row(_AGENDA_HEADER_CELL_TEMPLATE, AGENDA_HEADERS, widths))
+    for detail in details:
+        texts = [str(detail.get(column, '')) for column in DETAIL_COLUMNS]
+        tbl.append(_agenda_row(_AGENDA_CELL_TEMPLATE, texts, widths))
+    return tbl
+
+
+# --- Template placeholders ---
+PLACEHOLDER_PATTERN = re.compile(r"\[([^\[\]]+)\]")
+# Older templates have the year typed after the date placeholder ("[Date], 2025").
+# It's replaced along with the placeholder, since the filled-in date already has the right year.
+DATE_YEAR_PATTERN = re.compile(r",\s*\d{4}")
+
+
+class TemplatePlaceholders:
+    """
+    Where every [TOKEN] placeholder (and any phrases asked for) appears in a template's paragraphs,
+    found in one scan. Placeholders split across several runs (as Word often saves them) are handled.
+    Documents deep-copied from the template have the same paragraphs and runs, so one scan is reused
+    for every meeting rendered from it.
+    """
+
+    def __init__(self, doc, phrases=()):
+        # (paragraph index, NAME, [(run index, start, end), ...]) in document order
+        self.placeholders = []
+        # phrase -> index of the first paragraph that contains it
+        self.phrases = {}
+        for p_idx, para in enumerate(doc.paragraphs):
+            for phrase in phrases:
+                if phrase not in self.phrases and phrase in para.text:
+                    self.phrases[phrase] = p_idx
+
+            run_texts = [run.text for run in para.runs]
+            text = "".join(run_texts)
+            if "[" not in text:
+                continue
+            run_bounds = []
+            offset = 0
+            for run_text in run_texts:
+                run_bounds.append((offset, offset + len(run_text)))
+                offset += len(run_text)
+
+            for match in PLACEHOLDER_PATTERN.finditer(text):
+                name = match.group(1).strip().upper()
+                end = match.end()
+                if name == "DATE":
+                    year = DATE_YEAR_PATTERN.match(text, end)
+                    if year:
+                        end = year.end()
+                spans = [(r_idx, max(match.start(), run_start) - run_start, min(end, run_end) - run_start)
+                         for r_idx, (run_start, run_end) in enumerate(run_bounds)
+                         if run_start < end and run_end > match.start()]
+                self.placeholders.append((p_idx, name, spans))
+
+    def names(self):
+        return {name for _, name, _ in self.placeholders}
+
+    def substitute(self, doc, values):
+        """
+        Replace the placeholders named in values ({"NAME": text}) in doc, a copy of the scanned template.
+        The text takes the formatting of the run the placeholder starts in. Unknown placeholders are left alone.
+        """
+        self.substitute_body(doc.element.body, values)
+
+    def substitute_body(self, body, values):
+        """
+        substitute() on the w:body element of a copy of the scanned template's document.xml.
+        """
+        paragraphs = body.p_lst
+        # Go backwards so the offsets of earlier placeholders in the same run stay valid
+        for p_idx, name, spans in reversed(self.placeholders):
+            if name not in values:
+                continue
+            runs = paragraphs[p_idx].r_lst
+            for n, (r_idx, start, end) in enumerate(spans):
+                run_text = runs[r_idx].text
+                runs[r_idx].text = run_text[:start] + (str(values[name]) if n == 0 else "") + run_text[end:]
+
+
+def describe_meeting(meeting):
+    print(f"Processing meeting on {meeting['meeting_value']} with details:")
+    for detail in meeting["details"]:
+        print(f"Class: {detail.get('Class', '')}, "
+              f"Topic: {detail.get('Topic', '')}, "
+              f"Time: {detail.get('Time', '')}, "
+              f"Instructor: {detail.get('Instructor', '')}")
+    print(f"Uniform found: {meeting['uniform']}")
+
+
+# --- Render plans ---
+# Bump when the layout of a saved RenderPlan changes
+RENDER_PLAN_VERSION = 3
+
+# The drill test sign-up paragraph added to ABU meetings whose template doesn't have it:
+# centered, bold, size 16
+_DRILL_PARAGRAPH_TEMPLATE = parse_xml(
+    f'<w:p {nsdecls("w")}>'
+    '<w:pPr><w:jc w:val="center"/></w:pPr><w:r><w:rPr><w:b/><w:sz w:val="32"/></w:rPr></w:r>'
+    '</w:p>'
+)
+
+
+class RenderPlan:
+    """
+    A template compiled for rendering: its document.xml with the tables already removed, where the
+    placeholders and the drill test sign-up phrase are, the table style and width, and every other
+    part of the docx zip. Rendering a meeting only patches a fresh copy of document.xml and adds it
+    to a copy of the other zip entries, which are copied byte-for-byte, so the python-docx object
+    model is only built once, when the plan is compiled. Plans only hold bytes and plain data, so
+    they can be pickled, saved and sent to worker processes.
+    """
+
+    def __init__(self, template_path, drill_phrase):
+        template_doc = Document(template_path)
+        self.drill_phrase = drill_phrase
+        self.placeholders = TemplatePlaceholders(template_doc, [drill_phrase])
+        self.drill_paragraph = self.placeholders.phrases.get(drill_phrase)
+        self.table_style_id = template_doc.styles['Table Grid'].style_id
+        section = template_doc.sections[-1]
+        self.block_width = (section.page_width - section.left_margin - section.right_margin) // 635  # EMU to twentieths of a point
+
+        # Every table is replaced by the agenda table, so they're removed once here
+        document = copy.deepcopy(template_doc.element)
+        body = document.body
+        for tbl in body.tbl_lst:
+            body.remove(tbl)
+        # The drill paragraph goes after the template's paragraphs, just before the agenda table
+        self.paragraph_count = len(body.p_lst)
+        self.document_xml = serialize_part_xml(document)
+
+        # The other zip entries, copied as they are into an archive that each render adds document.xml to
+        self.document_name = template_doc.part.partname.lstrip("/")
+        other_parts = io.BytesIO()
+        with zipfile.ZipFile(template_path) as source, zipfile.ZipFile(other_parts, "w") as target:
+            # Read before copying: writestr moves the ZipInfo offsets to the target archive
+            headers = read_headers(source, document, self.document_name)
+            for info in source.infolist():
+                if info.filename == self.document_name:
+                    self.document_date_time = info.date_time
+                else:
+                    target.writestr(info, source.read(info))
+        # Page setup, paragraph styles and page headers for the native PDF renderer
+        self.pdf_layout = compile_pdf_layout(document, template_doc.styles.element, headers)
+        self.other_parts = other_parts.getvalue()
+
+    def render(self, meeting, config):
+        """
+        The docx (bytes) of one meeting.
+        meeting["dropdown_choice"] must already be set (see UniformRules.resolve).
+        """
+        return self.package(self.render_document(meeting, config))
+
+    def render_document(self, meeting, config):
+        """
+        The filled-in document.xml (its w:document element) of one meeting. See render.
+        """
+        document = parse_xml(self.document_xml)
+        body = document.body
+
+        values = {"DATE": meeting["date"].strftime("%B %d, %Y")}
+        if meeting["dropdown_choice"]:
+            values["UNIFORM"] = meeting["dropdown_choice"]
+        self.placeholders.substitute_body(body, values)
+
+        table = build_agenda_table(meeting["details"], self.table_style_id, self.block_width)
+        sectPr = body.find(qn('w:sectPr'))
+        if sectPr is not None:
+            sectPr.addprevious(table)
+        else:
+            body.append(table)
+
+        if config["add_drill_test_signup_text_to_abu_uniform_meetings"]:
+            if "abus" in meeting["uniform"].lower():
+                print(f"Adding drill test sign-up phrase. (Edit or disable this in the config file if needed.)")
+                if self.drill_paragraph is None:
+                    para = copy.deepcopy(_DRILL_PARAGRAPH_TEMPLATE)
+                    _set_run_text(para.find(qn('w:r')), self.drill_phrase)
+                    body.insert(self.paragraph_count, para)
+            elif self.drill_paragraph is not None:
+                body.p_lst[self.drill_paragraph].clear_content()
+        return document
+
+    def package(self, document):
+        """
+        The docx (bytes) with document as its document.xml and the template's other parts.
+        """
+        buffer = io.BytesIO(self.other_parts)
+        buffer.seek(0, io.SEEK_END)
+        with zipfile.ZipFile(buffer, "a") as docx:
+            info = zipfile.ZipInfo(self.document_name, self.document_date_time)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            docx.writestr(info, serialize_part_xml(document))
+        return buffer.getvalue()
+
+
+# Render plans already loaded by this process, keyed by (template path, drill phrase)
+_render_plan_cache = {}
+
+
+def load_render_plan(template_path, drill_phrase, cache_folder=None):
+    """
+    The RenderPlan of a template. With cache_folder, compiled plans are saved there under the
+    template's content hash, so other processes and later runs load the plan instead of compiling it.
+    """
+    from .files import write_file_atomic
+    from .outputs import template_hash
+
+    digest = hashlib.sha256(json.dumps([template_hash(template_path), drill_phrase]).encode()).hexdigest()
+    key = (template_path, drill_phrase)
+    cached = _render_plan_cache.get(key)
+    if cached and cached[0] == digest:
+        return cached[1]
+
+    plan = None
+    plan_path = os.path.join(cache_folder, "templates", f"v{RENDER_PLAN_VERSION}-{digest}.pickle") if cache_folder else None
+    if plan_path and os.path.isfile(plan_path):
+        try:
+            with open(plan_path, "rb") as f:
+                plan = pickle.load(f)
+        except Exception:
+            ...  # Unreadable plan, compile the template again below
+    if plan is None:
+        plan = RenderPlan(template_path, drill_phrase)
+        if plan_path:
+            try:
+                os.makedirs(os.path.dirname(plan_path), exist_ok=True)
+                write_file_atomic(plan_path, pickle.dumps(plan))
+            except Exception as e:
+                print(f"Could not save the compiled template: {e}")
+    _render_plan_cache[key] = (digest, plan)
+    return plan
@@ -0,0 +1,255 @@
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import warnings
+from datetime import datetime
+
+from . import telemetry
+
+# pandas, numpy, openpyxl and dateutil are imported by the functions that use them, so importing
+# this module (e.g. for the column names) stays cheap
+
+# Columns that make up a meeting block. The other columns are free-form notes and are ignored.
+MEETING_COLUMNS = ["Meeting", "Class", "Topic", "Time", "Instructor"]
+DETAIL_COLUMNS = ["Class", "Topic", "Time", "Instructor"]
+
+
+def parse_meeting_date(value):
+    """
+    Return the date in a "Meeting" cell as a datetime, or None if the cell is not a date.
+    """
+    if isinstance(value, datetime):
+        return value
+    from dateutil import parser as dateparser
+    try:
+        return dateparser.parse(str(value), fuzzy=True)
+    except Exception:
+        return None
+
+
+def _is_blank_cell(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+# Header cells are matched ignoring case and surrounding spaces
+_COLUMN_NAMES = {column.lower(): column for column in MEETING_COLUMNS}
+
+
+def detect_header(rows):
+    """
+    Find the header row of a sheet: the first row with a "Meeting" column and at least one of the
+    other meeting columns, so a title like "Meeting Schedule" or a lone "Meeting" note above the
+    table isn't mistaken for it. rows yields (row number, values) and is left just past the header.
+    Returns (row number, {column: position}).
+    """
+    for row_number, values in rows:
+        positions = {}
+        for i, value in enumerate(values):
+            if value is not None:
+                column = _COLUMN_NAMES.get(str(value).strip().lower())
+                if column:
+                    positions.setdefault(column, i)
+        if "Meeting" in positions and len(positions) > 1:
+            return row_number, positions
+    raise ValueError("Could not find 'Meeting' header in the sheet.")
+
+
+def stream_sheet(worksheet, target_dates=None, name=None):
+    """
+    Read the meeting columns of a worksheet (opened read-only) into a DataFrame, one row at a time.
+    The header row is found automatically (see detect_header); name labels the sheet in telemetry.
+    If target_dates is given, reading stops as soon as the blocks for those dates have been read.
+    Returns (df, complete, row_numbers), where complete is False if reading stopped before the end
+    of the sheet and row_numbers are the sheet row numbers of the DataFrame's rows.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rows = enumerate(worksheet.iter_rows(values_only=True), start=1)
+    with telemetry.stage("header_detection", file=name or worksheet.title):
+        _, positions = detect_header(rows)
+    columns = [column for column in MEETING_COLUMNS if column in positions]
+    meeting_position = columns.index("Meeting")
+
+    remaining = {d.date() if isinstance(d, datetime) else d for d in target_dates or ()}
+    records = []
+    row_numbers = []
+    previous_blank = True
+    in_target = False
+    complete = True
+    for row_number, values in rows:
+        cells = [values[positions[column]] if positions[column] < len(values) else None for column in columns]
+        blank = all(_is_blank_cell(value) for value in cells)
+        # Match what pandas.read_excel hands back for the same cells
+        record = [np.nan if value is None else int(value) if isinstance(value, float) and value.is_integer() else value
+                  for value in cells]
+        if blank:
+            if in_target:
+                remaining.discard(in_target)
+                if not remaining:
+                    records.append(record)
+                    row_numbers.append(row_number)
+                    complete = False
+                    break
+            in_target = False
+        elif previous_blank and remaining:
+            meeting_date = parse_meeting_date(record[meeting_position])
+            in_target = meeting_date.date() if meeting_date and meeting_date.date() in remaining else False
+        records.append(record)
+        row_numbers.append(row_number)
+        previous_blank = blank
+    return pd.DataFrame.from_records(records, columns=columns), complete, row_numbers
+
+
+def stream_current_sheet(spreadsheet, target_dates=None, name=None):
+    """
+    Read the meeting columns of the "Current" sheet into a DataFrame (see stream_sheet).
+    spreadsheet is a path or a binary file object (e.g. a BytesIO of a download); name labels it in telemetry.
+    The worksheet is opened read-only and streamed, so the rest of the workbook (other sheets,
+    notes columns) is never loaded.
+    Returns (df, complete), where complete is False if reading stopped before the end of the sheet.
+    """
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(spreadsheet, read_only=True, data_only=True)
+    try:
+        # Find a sheet name that matches 'current' (case-insensitive)
+        sheet_name = None
+        for s in workbook.sheetnames:
+            if s.strip().lower() in ["current"]:
+                sheet_name = s
+                break
+        if not sheet_name:
+            raise ValueError("The Excel file does not contain a sheet named 'Current'. Please check your spreadsheet.")
+        df, complete, _ = stream_sheet(workbook[sheet_name], target_dates, name or os.path.basename(str(spreadsheet)))
+    finally:
+        workbook.close()
+    return df, complete
+
+
+def build_meeting_index(df, row_numbers=None):
+    """
+    Group the "Current" sheet into meeting blocks, keyed by meeting date.
+    A block starts with a date in the "Meeting" column right after a blank row (or the header)
+    and runs until the next blank row. The cell below the date holds the uniform.
+    Blank rows and dates are worked out for the whole sheet at once instead of row by row.
+    Returns {date: meeting} in sheet order. Each meeting has its date, uniform and agenda details,
+    and with row_numbers (see stream_sheet) the first and last sheet rows of its block as "rows".
+    """
+    import numpy as np
+    import pandas as pd
+
+    present = [column for column in MEETING_COLUMNS if column in df.columns]
+    cells = df[present].astype("string").apply(lambda column: column.str.strip())
+    # A row is blank when all of its meeting columns are empty (notes columns are ignored)
+    blank = cells.isna() | (cells == "")
+    blank = blank.all(axis=1).to_numpy()
+    # Each run of non-blank rows gets its own number; the first row of each run may start a meeting
+    run_ids = np.cumsum(blank)
+    starts = ~blank & np.concatenate(([True], blank[:-1]))
+
+    meeting_column = df["Meeting"]
+    start_values = meeting_column[starts]
+    start_values = start_values[start_values.notna()]
+    # Real dates (the usual case) and plain date strings are converted in one go.
+    # Anything left over goes through the fuzzy parser one cell at a time.
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        start_dates = pd.to_datetime(start_values.astype(object), errors="coerce", format="mixed")
+    for idx in start_dates.index[start_dates.isna()]:
+        parsed = parse_meeting_date(start_values[idx])
+        start_dates[idx] = pd.NaT if parsed is None else parsed
+
+    detail_columns = [column for column in DETAIL_COLUMNS if column in df.columns]
+    records = df[detail_columns].to_dict("records")
+
+    index = {}
+    for idx, meeting_date in start_dates.dropna().items():
+        if meeting_date.date() in index:
+            print(f"⚠️ Warning: more than one meeting on {meeting_date.strftime('%m-%d-%Y')}. Only the first one is used.")
+            continue
+        uniform_value = ""
+        if idx + 1 < len(df):
+            uniform_value = str(meeting_column.iloc[idx + 1]).strip().upper()
+        details = []
+        row = idx
+        while row < len(df) and run_ids[row] == run_ids[idx] and not blank[row]:
+            detail = {column: records[row].get(column, "") for column in DETAIL_COLUMNS}
+            # Only add if at least one field is not empty
+            if any(str(v).strip() for v in detail.values()):
+                details.append(detail)
+            row += 1
+        index[meeting_date.date()] = {
+            "date": meeting_date.to_pydatetime(),
+            "meeting_value": df["Meeting"].iloc[idx],
+            "uniform": uniform_value,
+            "details": details,
+        }
+        if row_numbers is not None:
+            index[meeting_date.date()]["rows"] = (row_numbers[idx], row_numbers[row - 1])
+    return index
+
+
+def load_meeting_index(spreadsheet_path, cache_folder=None, target_dates=None, data=None):
+    """
+    Return the meeting index (see build_meeting_index) for the "Current" sheet of a workbook.
+    data is the workbook's bytes if they're already in memory (e.g. downloaded); otherwise
+    spreadsheet_path is read. Either way the file is read once and parsed from memory.
+    If target_dates is given, only those dates are returned, and the sheet is only read as far as
+    their blocks. Otherwise every meeting in the sheet is indexed.
+    With cache_folder, the meetings are kept in the schedule store there (see store.py) under the
+    workbook's path and content hash, so a workbook that hasn't changed since the last run is read from the
+    store instead of being parsed again.
+    """
+    if data is None:
+        with open(spreadsheet_path, "rb") as f:
+            data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    name = os.path.basename(spreadsheet_path)
+    wanted = {d.date() if isinstance(d, datetime) else d for d in target_dates} if target_dates else None
+
+    store = None
+    if cache_folder:
+        from .store import ScheduleStore, store_path, workbook_key
+
+        key = workbook_key(spreadsheet_path)
+        try:
+            store = ScheduleStore(store_path(cache_folder))
+            stored = store.workbook(key)
+            if stored and stored[0] == digest and (stored[1] or (wanted and store.has_dates(key, wanted))):
+                with telemetry.stage("meeting_lookup", file=name, cached=True):
+                    index = store.meetings(key, wanted)
+                store.close()
+                return index
+        except (sqlite3.Error, OSError) as e:
+            print(f"Could not read the schedule store: {e}")
+            store = None
+
+    with telemetry.stage("workbook_parse", file=name) as span:
+        span.bytes = len(data)
+        df, complete = stream_current_sheet(io.BytesIO(data), wanted, name=name)
+    with telemetry.stage("meeting_lookup", file=name, cached=False):
+        index = build_meeting_index(df)
+
+    if store is not None:
+        try:
+            with telemetry.stage("store_write", file=name):
+                store.store(key, digest, index, complete)
+        except sqlite3.Error as e:
+            print(f"Could not save the meetings to the schedule store: {e}")
+        finally:
+            store.close()
+    if wanted is not None:
+        index = {meeting_date: meeting for meeting_date, meeting in index.items() if meeting_date in wanted}
+    return index
+
+
+def meeting_hash(meeting):
+    """
+    Content hash of a meeting block: its date, uniform and agenda rows.
+    Two reads of the spreadsheet give the same hash for a meeting unless its rows changed.
+    """
+    payload = json.dumps([meeting["date"].isoformat(), meeting["uniform"], meeting["details"]], default=str, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
@@ -0,0 +1,229 @@
+"""
+The schedule store: the meetings of each workbook's "Current" sheet (the quarter) in one SQLite
+file, so later runs and lookups don't have to open Excel.
+
+Each meeting is kept whole (exactly what build_meeting_index made, for rendering) along with its
+date and uniform, and its agenda rows are kept one per row with their class, topic, time and
+instructor. Dates, classes and instructors are indexed, so questions like "which meetings have
+this class" or "what's the uniform on this date" take a few milliseconds.
+
+A workbook is stored under its absolute path (see workbook_key) along with the hash of its
+content, so workbooks with the same name in different folders don't replace each other. Squadron
+names depend on which workbooks are used together (see catalog.spreadsheet_squadrons), so callers
+name the workbooks in the results themselves. A store written from a
+partial read (a single-date run stops reading at that meeting) is marked incomplete and is filled
+in by later reads of the same content.
+"""
+import os
+import pickle
+import sqlite3
+from datetime import date, datetime
+
+# Bump when the tables change. An older store is emptied and filled again.
+STORE_VERSION = 2
+STORE_NAME = "schedule.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS workbooks (
+    path TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    complete INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meetings (
+    id INTEGER PRIMARY KEY,
+    workbook TEXT NOT NULL,
+    date TEXT NOT NULL,
+    uniform TEXT NOT NULL,
+    meeting BLOB NOT NULL,
+    UNIQUE (workbook, date)
+);
+CREATE INDEX IF NOT EXISTS meetings_date ON meetings (date);
+CREATE TABLE IF NOT EXISTS agenda (
+    meeting_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    class TEXT,
+    topic TEXT,
+    time TEXT,
+    instructor TEXT
+);
+CREATE INDEX IF NOT EXISTS agenda_meeting ON agenda (meeting_id);
+CREATE INDEX IF NOT EXISTS agenda_class ON agenda (class COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS agenda_instructor ON agenda (instructor COLLATE NOCASE);
+"""
+
+
+def store_path(cache_folder):
+    return os.path.join(cache_folder, STORE_NAME)
+
+
+def workbook_key(path):
+    """
+    The key a workbook is stored under: its absolute path, normalized.
+    """
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _date_key(value):
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.isoformat()
+
+
+def _cell_text(value):
+    """
+    An agenda cell as text for the indexed columns, or None if it's empty.
+    """
+    if value is None or (isinstance(value, float) and value != value):  # NaN
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def _match(column, value):
+    """
+    A WHERE condition on column: ignoring case, and with % as a wildcard if value has one.
+    """
+    return f"{column} {'LIKE' if '%' in value else '='} ? COLLATE NOCASE", value
+
+
+class ScheduleStore:
+    """
+    The schedule store at path (see store_path), created if it's missing. Use it as a context
+    manager, or close() it, when done. Each thread needs its own ScheduleStore.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Several spreadsheets can be stored at once from different threads
+        self.connection = sqlite3.connect(path, timeout=30)
+        if self._version() != STORE_VERSION:
+            # Checked again under the write lock: another thread or process may have set the store up
+            # while this one waited. (executescript would commit first, so the statements run one by one.)
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                if self._version() != STORE_VERSION:
+                    for table in ("workbooks", "meetings", "agenda"):
+                        self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+                    for statement in _SCHEMA.split(";"):
+                        if statement.strip():
+                            self.connection.execute(statement)
+                    self.connection.execute(f"PRAGMA user_version = {STORE_VERSION}")
+                self.connection.commit()
+            except BaseException:
+                self.connection.rollback()
+                self.connection.close()
+                raise
+
+    def _version(self):
+        return self.connection.execute("PRAGMA user_version").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def workbook(self, path):
+        """
+        (digest, complete) of the stored copy of a workbook (see workbook_key), or None if it isn't stored.
+        """
+        row = self.connection.execute("SELECT digest, complete FROM workbooks WHERE path = ?", (path,)).fetchone()
+        return (row[0], bool(row[1])) if row else None
+
+    def has_dates(self, path, dates):
+        keys = [_date_key(d) for d in dates]
+        found = self.connection.execute(
+            f"SELECT COUNT(*) FROM meetings WHERE workbook = ? AND date IN ({', '.join('?' * len(keys))})",
+            [path] + keys).fetchone()[0]
+        return found == len(set(keys))
+
+    def store(self, path, digest, meeting_index, complete):
+        """
+        Store the meeting index (see build_meeting_index) read from a workbook with this content hash.
+        The stored meetings of other content are replaced; for the same content, the meetings not
+        stored yet are added (a partial read never takes away what a fuller one stored).
+        """
+        with self.connection:
+            stored = self.workbook(path)
+            if stored and stored[0] == digest:
+                complete = complete or stored[1]
+            else:
+                self.connection.execute(
+                    "DELETE FROM agenda WHERE meeting_id IN (SELECT id FROM meetings WHERE workbook = ?)", (path,))
+                self.connection.execute("DELETE FROM meetings WHERE workbook = ?", (path,))
+            self.connection.execute("INSERT OR REPLACE INTO workbooks (path, digest, complete) VALUES (?, ?, ?)",
+                                    (path, digest, int(complete)))
+            for meeting_date, meeting in meeting_index.items():
+                cursor = self.connection.execute(
+                    "INSERT OR IGNORE INTO meetings (workbook, date, uniform, meeting) VALUES (?, ?, ?, ?)",
+                    (path, _date_key(meeting_date), meeting["uniform"], pickle.dumps(meeting)))
+                if not cursor.rowcount:
+                    continue  # Already stored from the same content
+                self.connection.executemany(
+                    "INSERT INTO agenda (meeting_id, position, class, topic, time, instructor) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(cursor.lastrowid, position, _cell_text(detail.get("Class")), _cell_text(detail.get("Topic")),
+                      _cell_text(detail.get("Time")), _cell_text(detail.get("Instructor")))
+                     for position, detail in enumerate(meeting["details"])])
+
+    def meetings(self, path, dates=None):
+        """
+        The stored meeting index of a workbook ({date: meeting}, in sheet order), or only the given dates of it.
+        """
+        query = "SELECT date, meeting FROM meetings WHERE workbook = ?"
+        params = [path]
+        if dates is not None:
+            keys = [_date_key(d) for d in dates]
+            query += f" AND date IN ({', '.join('?' * len(keys))})"
+            params += keys
+        rows = self.connection.execute(query + " ORDER BY id", params)
+        return {date.fromisoformat(key): pickle.loads(blob) for key, blob in rows}
+
+    def find(self, dates=None, workbooks=None, class_name=None, instructor=None):
+        """
+        The agenda rows on the given dates, in the given workbooks (see workbook_key), with the given
+        class and instructor (all if None), as dicts with the meeting's "date", "workbook" and
+        "uniform" cell and the row's "Class", "Topic", "Time" and "Instructor". Names are matched ignoring case,
+        and % in them matches anything (e.g. "%Smith").
+        """
+        conditions = []
+        params = []
+        if dates is not None:
+            keys = [_date_key(d) for d in dates]
+            conditions.append(f"m.date IN ({', '.join('?' * len(keys))})")
+            params += keys
+        if workbooks is not None:
+            conditions.append(f"m.workbook IN ({', '.join('?' * len(workbooks))})")
+            params += list(workbooks)
+        for column, value in (("a.class", class_name), ("a.instructor", instructor)):
+            if value is not None:
+                condition, param = _match(column, value)
+                conditions.append(condition)
+                params.append(param)
+        rows = self.connection.execute(
+            "SELECT m.date, m.workbook, m.uniform, a.class, a.topic, a.time, a.instructor "
+            "FROM agenda a JOIN meetings m ON m.id = a.meeting_id"
+            f"{' WHERE ' + ' AND '.join(conditions) if conditions else ''} "
+            "ORDER BY m.date, m.workbook, a.position", params)
+        return [{"date": date.fromisoformat(row[0]), "workbook": row[1], "uniform": row[2],
+                 "Class": row[3], "Topic": row[4], "Time": row[5], "Instructor": row[6]} for row in rows]
+
+    def uniforms(self, dates=None, workbooks=None):
+        """
+        [(date, workbook, uniform cell), ...] of the stored meetings, by date.
+        """
+        conditions = []
+        params = []
+        if dates is not None:
+            keys = [_date_key(d) for d in dates]
+            conditions.append(f"date IN ({', '.join('?' * len(keys))})")
+            params += keys
+        if workbooks is not None:
+            conditions.append(f"workbook IN ({', '.join('?' * len(workbooks))})")
+            params += list(workbooks)
+        rows = self.connection.execute(
+            f"SELECT date, workbook, uniform FROM meetings{' WHERE ' + ' AND '.join(conditions) if conditions else ''} "
+            "ORDER BY date, workbook", params)
+        return [(date.fromisoformat(key), workbook, uniform) for key, workbook, uniform in rows]
@@ -0,0 +1,180 @@
+"""
+Per-stage run telemetry: wall time, bytes and peak RSS for download, workbook parse, header
+detection, meeting lookup, docx render, save and PDF conversion.
+
+Off unless enable() is called (--telemetry-log / --prometheus-file). While it's off, stage()
+hands back one shared do-nothing context manager, so the instrumented code costs a function call.
+Stages can nest (header detection happens inside the workbook parse), so their times overlap.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+from .files import write_file_atomic
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_enabled = False
+_log_file = None
+# Events recorded in a worker process, to be sent back to the parent with the render result
+_collected = None
+# stage -> {"count", "seconds", "bytes"}, for the Prometheus file
+_totals = {}
+# Downloads record their stages from background threads
+_lock = threading.Lock()
+
+
+def peak_rss_bytes():
+    """
+    The most memory this process has used so far, or None where that can't be read.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _Stage:
+    __slots__ = ("name", "labels", "bytes", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.bytes = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event = {
+            "time": time.time(),
+            "stage": self.name,
+            "seconds": time.perf_counter() - self.start,
+            "bytes": self.bytes,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "pid": os.getpid(),
+            "ok": exc_type is None,
+        }
+        event.update(self.labels)
+        record(event)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+    bytes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setattr__(self, name, value):
+        ...  # Setting .bytes on a disabled stage is ignored
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name, **labels):
+    """
+    Context manager that times a stage. Set .bytes on it to record how much data the stage moved.
+    Extra keyword arguments are saved with the event (e.g. file=..., date=...).
+    """
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name, labels)
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable(log_path=None, collect=False):
+    """
+    Turn telemetry on. Events are appended to log_path as JSON lines if it's given.
+    collect=True keeps the events in memory for take_events() (used by worker processes). A
+    forked worker inherits the parent's log file and totals; those are dropped, since the parent
+    records the events it gets back from the worker.
+    """
+    global _enabled, _log_file, _collected
+    _enabled = True
+    if collect and _collected is None:
+        _collected = []
+        if _log_file is not None:
+            _log_file.close()
+            _log_file = None
+        _totals.clear()
+    if log_path and _log_file is None:
+        _log_file = open(log_path, "a", encoding="utf-8")
+
+
+def record(event):
+    with _lock:
+        totals = _totals.setdefault(event["stage"], {"count": 0, "seconds": 0.0, "bytes": 0})
+        totals["count"] += 1
+        totals["seconds"] += event["seconds"]
+        totals["bytes"] += event["bytes"] or 0
+        if _collected is not None:
+            _collected.append(event)
+        if _log_file is not None:
+            _log_file.write(json.dumps(event, default=str) + "\n")
+            _log_file.flush()
+
+
+def take_events():
+    """
+    Return the events collected since the last call and forget them.
+    """
+    global _collected
+    events = _collected or []
+    if _collected is not None:
+        _collected = []
+    return events
+
+
+def add_events(events):
+    """
+    Record events that were collected in a worker process.
+    """
+    if _enabled:
+        for event in events:
+            record(event)
+
+
+def write_prometheus(path):
+    """
+    Write the totals so far in the Prometheus text format (for node_exporter's textfile collector).
+    The file is replaced in one step so a half-written file is never scraped.
+    """
+    lines = [
+        "# HELP meeting_schedules_stage_seconds_total Wall time spent in each stage.",
+        "# TYPE meeting_schedules_stage_seconds_total counter",
+    ]
+    lines += [f'meeting_schedules_stage_seconds_total{{stage="{name}"}} {totals["seconds"]:.6f}' for name, totals in sorted(_totals.items())]
+    lines += [
+        "# HELP meeting_schedules_stage_runs_total Times each stage ran.",
+        "# TYPE meeting_schedules_stage_runs_total counter",
+    ]
+    lines += [f'meeting_schedules_stage_runs_total{{stage="{name}"}} {totals["count"]}' for name, totals in sorted(_totals.items())]
+    lines += [
+        "# HELP meeting_schedules_stage_bytes_total Bytes downloaded or written by each stage.",
+        "# TYPE meeting_schedules_stage_bytes_total counter",
+    ]
+    lines += [f'meeting_schedules_stage_bytes_total{{stage="{name}"}} {totals["bytes"]}' for name, totals in sorted(_totals.items())]
+    peak = peak_rss_bytes()
+    if peak is not None:
+        lines += [
+            "# HELP meeting_schedules_peak_rss_bytes Peak resident memory of the main process.",
+            "# TYPE meeting_schedules_peak_rss_bytes gauge",
+            f"meeting_schedules_peak_rss_bytes {peak}",
+        ]
+    write_file_atomic(path, ("\n".join(lines) + "\n").encode("utf-8"))
@@ -0,0 +1,98 @@
+"""
+Maps the uniform cell of each meeting to the uniform text used in the schedule, using a table of
+rules that's compiled once. The table can be replaced with "uniform_rules" in the preferences.
+"""
+import re
+
+# Tried in order; the first rule whose pattern is found in the cell (ignoring case) wins.
+# A rule either names the uniform, or has "abu_sleeves": true when the cell doesn't say if the
+# sleeves are rolled or down (answered by --abu-sleeves / abu_sleeves, or asked once for the run).
+DEFAULT_UNIFORM_RULES = [
+    {"pattern": r"^pt$", "uniform": "PT"},
+    {"pattern": r"^blues( with tie)?$", "uniform": "Blues with Tie"},
+    {"pattern": r"sleeves rolled", "uniform": "ABUs (sleeves rolled)"},
+    {"pattern": r"sleeves down", "uniform": "ABUs (sleeves down)"},
+    {"pattern": r"^abu$", "abu_sleeves": True},
+]
+ABU_SLEEVES_UNIFORMS = {
+    "rolled": "ABUs (sleeves rolled)",
+    "down": "ABUs (sleeves down)",
+}
+# What classify() returns for a cell that needs the ABU sleeves answer
+NEEDS_SLEEVES = object()
+
+
+class UniformRules:
+    """
+    A compiled uniform rule table. Each distinct cell is matched against the rules once, however
+    many meetings share it. abu_sleeves ("rolled" or "down", in any case) answers the sleeves
+    question; if it's not given, the user is asked once and the answer is kept for the rest of the run.
+    Raises ValueError if a rule or abu_sleeves is invalid.
+    """
+
+    def __init__(self, rules=None, abu_sleeves=None):
+        self.rules = []
+        for rule in rules if rules is not None else DEFAULT_UNIFORM_RULES:
+            try:
+                pattern = re.compile(rule["pattern"], re.IGNORECASE)
+            except (KeyError, TypeError, re.error) as e:
+                raise ValueError(f"Invalid uniform rule {rule!r}: {e}") from None
+            if rule.get("abu_sleeves"):
+                self.rules.append((pattern, NEEDS_SLEEVES))
+            elif "uniform" in rule:
+                self.rules.append((pattern, rule["uniform"]))
+            else:
+                raise ValueError(f"Invalid uniform rule {rule!r}: it needs \"uniform\" or \"abu_sleeves\": true")
+        if abu_sleeves is not None:
+            abu_sleeves = str(abu_sleeves).strip().lower()
+            if abu_sleeves not in ABU_SLEEVES_UNIFORMS:
+                raise ValueError(f"Invalid abu_sleeves {abu_sleeves!r}: it must be \"rolled\" or \"down\"")
+        self.abu_sleeves = abu_sleeves
+        self._matches = {}
+
+    def classify(self, uniform_value):
+        """
+        The uniform text for a cell, NEEDS_SLEEVES if the sleeves question decides it, or None if no rule matches.
+        """
+        value = uniform_value.strip()
+        if value not in self._matches:
+            self._matches[value] = next((result for pattern, result in self.rules if pattern.search(value)), None)
+        return self._matches[value]
+
+    def resolve(self, meetings):
+        """
+        Set meeting["dropdown_choice"] for every meeting. Cells that need the ABU sleeves answer are
+        collected first, so there's at most one question for the whole batch, and cells no rule
+        matches are reported together (their schedules keep the [UNIFORM] placeholder).
+        """
+        needs_sleeves = []
+        unmatched = {}
+        for meeting in meetings:
+            choice = self.classify(meeting["uniform"])
+            if choice is NEEDS_SLEEVES:
+                needs_sleeves.append(meeting)
+                choice = None
+            elif choice is None:
+                unmatched.setdefault(meeting["uniform"], []).append(meeting["date"].strftime("%m-%d-%Y"))
+            meeting["dropdown_choice"] = choice
+
+        if unmatched:
+            print(f"⚠️ No uniform rule matches {len(unmatched)} uniform(s); [UNIFORM] is left as is in these schedules:")
+            for value, dates in unmatched.items():
+                print(f"  {value!r}: {', '.join(dates)}")
+
+        if needs_sleeves:
+            if not self.abu_sleeves:
+                dates = ", ".join(meeting["date"].strftime("%m-%d-%Y") for meeting in needs_sleeves)
+                sleeves = input(f"ABU sleeves rolled or down not specified for {dates}. Should ABU sleeves be rolled? [Y/N]: ").strip().upper()
+                self.abu_sleeves = "rolled" if sleeves == "Y" else "down"
+            for meeting in needs_sleeves:
+                meeting["dropdown_choice"] = ABU_SLEEVES_UNIFORMS[self.abu_sleeves]
+
+
+def load_uniform_rules(config, abu_sleeves=None):
+    """
+    The uniform rules from the preferences ("uniform_rules"), or the default ones.
+    Raises ValueError if a rule or abu_sleeves is invalid.
+    """
+    return UniformRules(config.get("uniform_rules"), abu_sleeves)
@@ -0,0 +1,180 @@
+"""
+Uploads the generated schedules to the meeting folders on SharePoint.
+
+Files are uploaded in parallel threads, each with its own ClientContext but all sharing one pooled
+requests session. Files bigger than upload_chunk_mb are sent in chunks with an upload session.
+The hash of every uploaded file is kept along with the ETag SharePoint gave it, so a file that
+hasn't changed locally, and whose SharePoint copy is still the one uploaded, isn't sent again.
+"""
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import telemetry
+from .files import write_file_atomic
+
+
+class UploadCache:
+    """
+    The SHA-256 and SharePoint ETag of every file uploaded so far, keyed by its SharePoint path.
+    """
+
+    def __init__(self, cache_folder):
+        self.index_path = os.path.join(cache_folder, "uploads.json")
+        self.entries = {}
+        # Uploads run in parallel threads and share this cache
+        self.lock = threading.Lock()
+        if os.path.isfile(self.index_path):
+            try:
+                with open(self.index_path) as f:
+                    self.entries = json.load(f)
+            except Exception:
+                self.entries = {}
+
+    def lookup(self, remote_path, sha256):
+        """
+        The ETag the SharePoint copy had when this exact content was uploaded, or None.
+        """
+        entry = self.entries.get(remote_path)
+        if entry and entry["sha256"] == sha256:
+            return entry["etag"]
+        return None
+
+    def store(self, remote_path, sha256, etag):
+        with self.lock:
+            self.entries[remote_path] = {"sha256": sha256, "etag": etag}
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            write_file_atomic(self.index_path, json.dumps(self.entries, indent=4).encode())
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_client_context(site_url, config, session):
+    """
+    A ClientContext for the SharePoint site that sends its requests over session.
+    Signs in with an app-only client id and secret (sharepoint_client_id and sharepoint_client_secret,
+    or the SHAREPOINT_CLIENT_SECRET environment variable), or with an access token from the
+    SHAREPOINT_ACCESS_TOKEN environment variable.
+    """
+    from office365.sharepoint.client_context import ClientContext
+
+    ctx = ClientContext(site_url)
+    access_token = os.environ.get("SHAREPOINT_ACCESS_TOKEN")
+    client_secret = config.get("sharepoint_client_secret") or os.environ.get("SHAREPOINT_CLIENT_SECRET")
+    if access_token:
+        ctx.with_access_token(lambda: {"tokenType": "Bearer", "accessToken": access_token})
+    elif config.get("sharepoint_client_id") and client_secret:
+        ctx.with_client_credentials(config["sharepoint_client_id"], client_secret)
+    else:
+        raise RuntimeError("No SharePoint credentials. Set sharepoint_client_id and sharepoint_client_secret "
+                           "in the preferences, or the SHAREPOINT_ACCESS_TOKEN environment variable.")
+    # Older versions of the library always use their own session
+    if hasattr(ctx, "with_transport"):
+        ctx.with_transport(session=session)
+    return ctx
+
+
+def remote_folder_for(result, base_meetings_folder, sharepoint_folder):
+    """
+    The SharePoint folder a schedule goes in: the same path below sharepoint_meetings_folder as its
+    meeting folder has below base_meetings_folder (MM-DD-YYYY, or squadron/MM-DD-YYYY).
+    """
+    local_folder = os.path.dirname(os.path.abspath(result["docx"]))
+    relative = os.path.relpath(local_folder, os.path.abspath(base_meetings_folder))
+    if relative.startswith(os.pardir) or os.path.isabs(relative):
+        # Saved outside base_meetings_folder (e.g. a run from inside a meeting folder)
+        relative = result["date"]
+    return "/".join([sharepoint_folder] + relative.replace(os.sep, "/").split("/"))
+
+
+def upload_schedules(results, config, cache_folder, max_workers=4):
+    """
+    Upload the docx and PDF of every successful result to SharePoint, creating the meeting folders as needed.
+    Returns (uploaded, unchanged, failed) file counts.
+    """
+    from .downloads import make_download_session
+
+    site_url = config["sharepoint_site_url"]
+    sharepoint_folder = config["sharepoint_meetings_folder"].rstrip("/")
+    chunk_size = int(config.get("upload_chunk_mb", 4) * 1024 * 1024)
+
+    folders = {}
+    for result in results:
+        if result["docx"] and not result["error"]:
+            remote_folder = remote_folder_for(result, config["base_meetings_folder"], sharepoint_folder)
+            folders.setdefault(remote_folder, []).extend(path for path in (result["docx"], result["pdf"]) if path)
+    if not folders:
+        return 0, 0, 0
+
+    session = make_download_session(pool_size=max_workers)
+    cache = UploadCache(cache_folder)
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, "ctx"):
+            local.ctx = make_client_context(site_url, config, session)
+        return local.ctx
+
+    def remote_etag(remote_path):
+        """
+        The ETag of the SharePoint copy of a file, or None if there isn't one.
+        """
+        from office365.runtime.client_request_exception import ClientRequestException
+
+        try:
+            return client().web.get_file_by_server_relative_path(remote_path).get().execute_query().properties.get("ETag")
+        except ClientRequestException:
+            return None
+
+    def upload_folder(remote_folder, paths):
+        """
+        Create the folder if it's missing and upload the files in it that changed.
+        Returns "uploaded", "unchanged" or the error for each file.
+        """
+        folder = None
+        statuses = []
+        for path in paths:
+            name = os.path.basename(path)
+            remote_path = f"{remote_folder}/{name}"
+            try:
+                sha256 = file_sha256(path)
+                etag = cache.lookup(remote_path, sha256)
+                if etag is not None and remote_etag(remote_path) == etag:
+                    statuses.append("unchanged")
+                    continue
+                if folder is None:
+                    # The base folder was made up front, so only the meeting folder is added here
+                    base = client().web.get_folder_by_server_relative_path(sharepoint_folder)
+                    folder = base.folders.ensure_by_path(remote_folder[len(sharepoint_folder):]).execute_query()
+                with telemetry.stage("upload", file=name) as span, open(path, "rb") as f:
+                    size = os.path.getsize(path)
+                    if size > chunk_size:
+                        remote = folder.files.create_upload_session(f, chunk_size, file_name=name).execute_query()
+                    else:
+                        remote = folder.files.upload(f, name).execute_query()
+                    span.bytes = size
+                cache.store(remote_path, sha256, remote.properties.get("ETag") or remote_etag(remote_path))
+                statuses.append("uploaded")
+                print(f"Uploaded {name} to {remote_folder}.")
+            except Exception as e:
+                print(f"⚠️ Could not upload {name} to {remote_folder}: {e}")
+                statuses.append(e)
+        return statuses
+
+    client().web.ensure_folder_path(sharepoint_folder).execute_query()
+    statuses = []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(folders))) as pool:
+        for future in [pool.submit(upload_folder, remote_folder, paths) for remote_folder, paths in folders.items()]:
+            statuses.extend(future.result())
+    session.close()
+    uploaded = statuses.count("uploaded")
+    unchanged = statuses.count("unchanged")
+    return uploaded, unchanged, len(statuses) - uploaded - unchanged
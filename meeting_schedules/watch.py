@@ -0,0 +1,77 @@
+import io
+import os
+import time
+
+from .spreadsheet import load_meeting_index, meeting_hash
+
+
+def spreadsheet_poller(spreadsheet_path, url=None, session=None, cache=None):
+    """
+    Return a function that returns the spreadsheet's bytes if it changed since it was last called,
+    or None if it didn't. A local file is checked by its modification time and size. With a url, the
+    spreadsheet is downloaded into memory with a conditional request, so SharePoint only sends it when it changed.
+    """
+    if url:
+        from .downloads import download_with_retries
+
+        def poll():
+            buffer = io.BytesIO()
+            response = download_with_retries(url, buffer, "Checking master spreadsheet", session, cache=cache, quiet=True)
+            if response.status_code not in (200, 304):
+                raise RuntimeError(f"Failed to download spreadsheet. Status code: {response.status_code}")
+            return buffer.getvalue() if response.status_code == 200 else None
+        return poll
+
+    last_seen = [None]
+    def poll():
+        stat = os.stat(spreadsheet_path)
+        seen = (stat.st_mtime_ns, stat.st_size)
+        changed = last_seen[0] is not None and seen != last_seen[0]
+        last_seen[0] = seen
+        if not changed:
+            return None
+        with open(spreadsheet_path, "rb") as f:
+            return f.read()
+    poll()  # Remember what the file looks like now
+    return poll
+
+
+def watch_spreadsheets(pollers, selected, target_dates, cache_folder, interval=30):
+    """
+    Poll the spreadsheets every interval seconds and yield the (spreadsheet, meeting) pairs whose
+    blocks changed (or are new) since the last read. pollers maps each spreadsheet to its
+    spreadsheet_poller, selected is the (spreadsheet, meeting) pairs already generated.
+    Runs until interrupted.
+    """
+    snapshot = {(path, meeting["date"].date()): meeting_hash(meeting) for path, meeting in selected}
+    while True:
+        time.sleep(interval)
+        changed = []
+        for spreadsheet_path, poll in pollers.items():
+            name = os.path.basename(spreadsheet_path)
+            try:
+                data = poll()
+                if data is None:
+                    continue
+                meeting_index = load_meeting_index(spreadsheet_path, cache_folder, target_dates, data=data)
+            except Exception as e:
+                print(f"⚠️ Error: {name}: {e}")
+                continue
+
+            changed_before = len(changed)
+            for meeting_date, meeting in meeting_index.items():
+                if target_dates and meeting_date not in target_dates:
+                    continue
+                key = (spreadsheet_path, meeting_date)
+                digest = meeting_hash(meeting)
+                if snapshot.get(key) != digest:
+                    snapshot[key] = digest
+                    changed.append((spreadsheet_path, meeting))
+            for key in [key for key in snapshot if key[0] == spreadsheet_path and key[1] not in meeting_index]:
+                print(f"{name}: the meeting on {key[1].strftime('%m-%d-%Y')} is no longer in the spreadsheet.")
+                del snapshot[key]
+            if len(changed) == changed_before:
+                print(f"{name} changed, but none of the meetings did.")
+        if changed:
+            print(f"{len(changed)} meeting(s) changed: {', '.join(meeting['date'].strftime('%m-%d-%Y') for _, meeting in changed)}")
+            yield changed